@@ -4,25 +4,27 @@ Script to apply source code and filesystem modifications with git rollback suppo
 Usage: python modify.py
 """
 import os
+import ast
 import shutil
+import tempfile
 import re
+import stat
 import logging
 import subprocess
 import datetime
 import json
+import functools
 import libcst as cst
 from typing import Optional, List, Tuple
 
 logging.basicConfig(level=logging.DEBUG, format='%(levelname)s: %(message)s')
 
-import libcst as cst
-from typing import Tuple, List
 
 
 # near other LibCST helpers
 def _target_exists(source: str, target_name: str, chain: list[str]) -> bool:
     try:
-        mod = cst.parse_module(source)
+        mod = _parse_source(source)
     except Exception:
         return False
 
@@ -124,7 +126,7 @@ def remove_block(source: str, target_name: str, lexical_chain: List[str]) -> Tup
     Returns: (new_source, removed_bool)
     """
     try:
-        mod = cst.parse_module(source)
+        mod = _parse_source(source)
     except Exception:
         # If parsing fails, do nothing
         return source, False
@@ -178,11 +180,35 @@ class InsertIntoContainer(cst.CSTTransformer):
         """Check if current context matches where we want to insert"""
         return self.context_stack == self.lexical_chain
 
+_GIT_EXECUTABLE = None
+
+def _git_run(cmd, **kwargs):
+    """
+    subprocess.run() for a ['git', ...] command, set up so CPython can launch
+    it with posix_spawn instead of fork+exec.
+
+    The posix_spawn path is only taken when the executable is an absolute path
+    and close_fds is False, so git is resolved once via PATH and fds are left
+    alone (Python-created fds are non-inheritable by default anyway). This keeps
+    spawn cost independent of how large the process has grown after libcst loads.
+    """
+    global _GIT_EXECUTABLE
+    if _GIT_EXECUTABLE is None:
+        _GIT_EXECUTABLE = shutil.which('git') or 'git'
+    kwargs.setdefault('close_fds', False)
+    return subprocess.run([_GIT_EXECUTABLE] + list(cmd[1:]), **kwargs)
+
 class GitRollbackManager:
     """Manages git-based rollback operations for code modifications"""
     
-    def __init__(self, rollback_file='.modification_rollback.json'):
+    # The log is compacted back to this many (most recent) entries once it grows past it
+    MAX_LOG_ENTRIES = 20
+
+    def __init__(self, rollback_file='.modification_rollback.jsonl'):
         self.rollback_file = rollback_file
+        # Rollback data written by older versions, as a single JSON document
+        root, ext = os.path.splitext(rollback_file)
+        self.legacy_rollback_file = root + '.json' if ext == '.jsonl' else None
         self.rollback_data = {}
         self.tracked_files = set()
         self.accumulated_message = ""
@@ -203,8 +229,8 @@ class GitRollbackManager:
     def has_staged_changes(self):
         """Check if there are staged changes ready to commit"""
         try:
-            result = subprocess.run(['git', 'diff', '--cached', '--name-only'], 
-                                  check=True, capture_output=True, text=True)
+            result = _git_run(['git', 'diff', '--cached', '--name-only'], 
+                            check=True, capture_output=True, text=True)
             return bool(result.stdout.strip())
         except subprocess.CalledProcessError:
             return False
@@ -235,11 +261,11 @@ class GitRollbackManager:
         if not current_commit:
             raise RuntimeError("Failed to get current git commit hash")
         
-        # Check git configuration
-        try:
-            subprocess.run(['git', 'config', 'user.name'], check=True, capture_output=True)
-            subprocess.run(['git', 'config', 'user.email'], check=True, capture_output=True)
-        except subprocess.CalledProcessError:
+        # Check git configuration (both keys in one git invocation)
+        result = _git_run(['git', 'config', '--get-regexp', r'^user\.(name|email)$'],
+                          capture_output=True)
+        configured = {line.split(b' ', 1)[0] for line in result.stdout.splitlines()}
+        if not {b'user.name', b'user.email'} <= configured:
             raise RuntimeError("Git user.name and user.email must be configured")
         
         # If this is the initial rollback point creation (no existing rollback data), 
@@ -257,18 +283,26 @@ class GitRollbackManager:
             self._save_rollback_data()
             logging.info(f"Created rollback point: {current_commit}")
         
-        # Add only tracked files to staging
+        # Add only tracked files to staging, one `git add` for all of them
         if self.tracked_files:
-            for file_path in self.tracked_files:
-                if os.path.exists(file_path):
-                    result = subprocess.run(['git', 'add', file_path], capture_output=True)
-                    if result.returncode != 0:
-                        raise RuntimeError(f"Failed to stage file {file_path}: {result.stderr.decode()}")
-                else:
-                    # File was deleted, add it for removal
-                    result = subprocess.run(['git', 'add', file_path], capture_output=True)
-                    if result.returncode != 0:
-                        logging.warning(f"Failed to stage deleted file {file_path}: {result.stderr.decode()}")
+            existing = sorted(p for p in self.tracked_files if os.path.exists(p))
+            deleted = sorted(p for p in self.tracked_files if not os.path.exists(p))
+            if existing:
+                result = _git_run(['git', 'add', '--'] + existing,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                if result.returncode != 0:
+                    raise RuntimeError(f"Failed to stage files {existing}: {result.stderr.decode()}")
+            if deleted:
+                # Files were deleted, add them for removal
+                result = _git_run(['git', 'add', '--'] + deleted,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                if result.returncode != 0:
+                    # One unknown path fails the whole batch; stage the rest individually
+                    for file_path in deleted:
+                        result = _git_run(['git', 'add', '--', file_path],
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                        if result.returncode != 0:
+                            logging.warning(f"Failed to stage deleted file {file_path}: {result.stderr.decode()}")
         
         # Check if there are staged changes to commit
         has_staged = self.has_staged_changes()
@@ -279,10 +313,10 @@ class GitRollbackManager:
         else:
             if not has_staged:
                 # force_commit=True but no staged changes - create empty commit
-                result = subprocess.run(['git', 'commit', '--no-verify', '--allow-empty', '-m', message], capture_output=True)
+                result = _git_run(['git', 'commit', '--no-verify', '--allow-empty', '-m', message], capture_output=True)
             else:
                 # Normal commit with staged changes
-                result = subprocess.run(['git', 'commit', '--no-verify', '-m', message], capture_output=True)
+                result = _git_run(['git', 'commit', '--no-verify', '-m', message], capture_output=True)
             
             if result.returncode != 0:
                 stderr_msg = result.stderr.decode().strip()
@@ -322,9 +356,13 @@ class GitRollbackManager:
     
     def is_git_repo(self):
         """Check if current directory is a git repository"""
+        # Cheap probe first: a .git directory (or worktree/submodule .git file)
+        # in the cwd settles it without spawning git
+        if os.path.isdir('.git') or os.path.isfile('.git'):
+            return True
         try:
-            subprocess.run(['git', 'rev-parse', '--git-dir'], 
-                         check=True, capture_output=True)
+            _git_run(['git', 'rev-parse', '--git-dir'], 
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return True
         except subprocess.CalledProcessError:
             return False
@@ -332,26 +370,32 @@ class GitRollbackManager:
     def get_current_commit(self):
         """Get current commit hash"""
         try:
-            result = subprocess.run(['git', 'rev-parse', 'HEAD'], 
-                                  check=True, capture_output=True, text=True)
-            return result.stdout.strip()
+            result = _git_run(['git', 'rev-parse', 'HEAD'], 
+                            check=True, capture_output=True)
         except subprocess.CalledProcessError:
             return None
+        # A hex object name is pure ASCII: decode the raw bytes once, no text wrapper
+        commit_hash = result.stdout.rstrip(b'\n').decode('ascii')
+        if len(commit_hash) not in (40, 64):  # SHA-1 or SHA-256 repository
+            logging.warning(f"Unexpected output from git rev-parse HEAD: {commit_hash!r}")
+            return None
+        return commit_hash
     
     def get_current_branch(self):
         """Get current branch name"""
         try:
-            result = subprocess.run(['git', 'branch', '--show-current'], 
-                                  check=True, capture_output=True, text=True)
-            return result.stdout.strip()
+            result = _git_run(['git', 'branch', '--show-current'], 
+                            check=True, capture_output=True)
+            # Branch names may contain non-ASCII characters, so decode as UTF-8
+            return result.stdout.rstrip(b'\n').decode('utf-8')
         except subprocess.CalledProcessError:
             return None
     
     def has_uncommitted_changes(self):
         """Check if there are uncommitted changes"""
         try:
-            result = subprocess.run(['git', 'status', '--porcelain'], 
-                                  check=True, capture_output=True, text=True)
+            result = _git_run(['git', 'status', '--porcelain'], 
+                            check=True, capture_output=True, text=True)
             return bool(result.stdout.strip())
         except subprocess.CalledProcessError:
             return False
@@ -369,8 +413,8 @@ class GitRollbackManager:
             return False
         
         try:
-            subprocess.run(['git', 'reset', '--soft', commit_hash], 
-                         check=True, capture_output=True)
+            _git_run(['git', 'reset', '--soft', commit_hash], 
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             logging.info(f"Soft rollback to {commit_hash} - changes staged")
             return True
         except subprocess.CalledProcessError as e:
@@ -390,8 +434,8 @@ class GitRollbackManager:
             return False
         
         try:
-            subprocess.run(['git', 'reset', '--hard', commit_hash], 
-                         check=True, capture_output=True)
+            _git_run(['git', 'reset', '--hard', commit_hash], 
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             logging.info(f"Hard rollback to {commit_hash} - all changes discarded")
             return True
         except subprocess.CalledProcessError as e:
@@ -425,8 +469,8 @@ class GitRollbackManager:
         
         try:
             # Create new branch from the rollback commit
-            subprocess.run(['git', 'checkout', '-b', new_branch_name, commit_hash], 
-                         check=True, capture_output=True)
+            _git_run(['git', 'checkout', '-b', new_branch_name, commit_hash], 
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             
             logging.info(f"Abandoned development line - new branch '{new_branch_name}' created from {commit_hash}")
             logging.info(f"Previous branch '{current_branch}' still exists if you need to reference it")
@@ -464,12 +508,12 @@ class GitRollbackManager:
         try:
             # Switch to target branch if not already on it
             if current_branch != target_branch:
-                subprocess.run(['git', 'checkout', target_branch], 
-                             check=True, capture_output=True)
+                _git_run(['git', 'checkout', target_branch], 
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             
             # Force reset to the commit
-            subprocess.run(['git', 'reset', '--hard', commit_hash], 
-                         check=True, capture_output=True)
+            _git_run(['git', 'reset', '--hard', commit_hash], 
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             
             logging.warning(f"DESTRUCTIVE: Reset branch '{target_branch}' to {commit_hash}")
             logging.warning("All commits after the rollback point have been permanently lost")
@@ -508,23 +552,48 @@ class GitRollbackManager:
         print(f"  git checkout -b new-branch-name {commit_hash}")
     
     def _save_rollback_data(self):
-        """Save rollback data to file"""
+        """Append rollback data to the rollback log (one JSON object per line)"""
         try:
-            with open(self.rollback_file, 'w') as f:
-                json.dump(self.rollback_data, f, indent=2)
+            with open(self.rollback_file, 'a+') as f:
+                f.write(json.dumps(self.rollback_data) + '\n')
+                f.seek(0)
+                entries = f.read().splitlines()
+            if len(entries) > self.MAX_LOG_ENTRIES:
+                # Only the last entry is ever loaded; keep a short history, not an unbounded one
+                _atomic_write(self.rollback_file, '\n'.join(entries[-self.MAX_LOG_ENTRIES:]) + '\n')
         except Exception as e:
             logging.warning(f"Could not save rollback data: {e}")
     
     def _load_rollback_data(self):
-        """Load rollback data from file"""
+        """Load the most recent rollback data from the rollback log (or a legacy .json file)"""
         try:
             if os.path.exists(self.rollback_file):
-                with open(self.rollback_file, 'r') as f:
+                last_line = self._read_last_line(self.rollback_file)
+                self.rollback_data = json.loads(last_line) if last_line else {}
+            elif self.legacy_rollback_file and os.path.exists(self.legacy_rollback_file):
+                with open(self.legacy_rollback_file, 'r') as f:
                     self.rollback_data = json.load(f)
         except Exception as e:
             logging.warning(f"Could not load rollback data: {e}")
             self.rollback_data = {}
 
+    @staticmethod
+    def _read_last_line(path, chunk_size=4096):
+        """Return the last non-empty line of a file, reading backwards from the end"""
+        with open(path, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            buf = b''
+            while pos > 0:
+                step = min(chunk_size, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+                tail = buf.rstrip(b'\n')
+                nl = tail.rfind(b'\n')
+                if nl >= 0:
+                    return tail[nl + 1:].decode()
+            return buf.rstrip(b'\n').decode()
+
 # pip install libcst
 
 def parse_lexical_chain(target_path: str) -> tuple[str, List[str]]:
@@ -543,8 +612,6 @@ def parse_lexical_chain(target_path: str) -> tuple[str, List[str]]:
     
     return parts[-1], parts[:-1]
 
-import libcst as cst
-from typing import List, Optional
 
 class ReplaceDeclaration(cst.CSTTransformer):
     """
@@ -553,7 +620,8 @@ class ReplaceDeclaration(cst.CSTTransformer):
       - Module-level def/assign
       - Method/assign inside a class chain like A.B (self.chain == ["A","B"])
     """
-    def __init__(self, target_name: str, lexical_chain: List[str], new_code: str, kind: Optional[str] = None):
+    def __init__(self, target_name: str, lexical_chain: List[str], new_code: Optional[str] = None,
+                 kind: Optional[str] = None, replacement_node: Optional[cst.BaseStatement] = None):
         self.target_name = target_name
         self.chain = lexical_chain or []
         self.new_code = new_code
@@ -561,14 +629,26 @@ class ReplaceDeclaration(cst.CSTTransformer):
         self.class_stack: List[str] = []
         self.replaced = False  # <-- add this
 
-        try:
-            self._replacement_module = cst.parse_module(self.new_code)
-        except Exception:
-            self._replacement_module = None
+        if replacement_node is not None:
+            # Caller already parsed new_code; wrap the node instead of re-parsing it
+            self._replacement_module = cst.Module(body=[replacement_node])
+        else:
+            try:
+                self._replacement_module = _parse_snippet(self.new_code)
+            except Exception:
+                self._replacement_module = None
 
     # ---- context tracking for lexical chain ----
-    def visit_ClassDef(self, node: cst.ClassDef) -> None:
+    def visit_ClassDef(self, node: cst.ClassDef) -> bool:
         self.class_stack.append(node.name.value)
+        # Only descend while still on the path to the target chain; anything
+        # deeper or in a sibling class can never match.
+        depth = len(self.class_stack)
+        return depth <= len(self.chain) and self.class_stack == self.chain[:depth]
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> bool:
+        # Targets live at module or class scope, never inside a function body
+        return False
 
     def leave_ClassDef(self, original_node: cst.ClassDef, updated_node: cst.ClassDef) -> cst.CSTNode:
         # Replace methods/assignments inside the matched class chain is handled in the leaf visitors
@@ -623,6 +703,25 @@ class ReplaceDeclaration(cst.CSTTransformer):
         return updated_node
 
 
+@functools.lru_cache(maxsize=32)
+def _parse_source(content: str) -> cst.Module:
+    """
+    Parse a whole file's source with LibCST, memoized on the text. A single
+    declare() may look at the same content several times (replace, existence
+    check, remove, insert); only the first look pays for the parse.
+    """
+    return cst.parse_module(content)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_snippet(code: str) -> cst.Module:
+    """
+    Parse a new_code snippet with LibCST, memoized on the snippet text.
+    LibCST trees are immutable, so the cached Module is shared as-is.
+    """
+    return cst.parse_module(code)
+
+
 def replace_block(content: str,
                   new_code: str,
                   target_name: Optional[str] = None,
@@ -638,7 +737,7 @@ def replace_block(content: str,
         tuple: (modified_content, was_replaced)
     """
     # Parse new_code
-    mod = cst.parse_module(new_code)
+    mod = _parse_snippet(new_code)
     
     # Initialize variables to avoid UnboundLocalError
     replacement_node = None
@@ -743,19 +842,21 @@ def replace_block(content: str,
     kind = kind or inferred_kind
     target_name = target_name or inferred_name
     
-    # Perform the replacement using only the replacement_node
-    module = cst.parse_module(content)
-    
-    # Create a version of new_code with just the replacement node for the transformer
-    single_node_code = cst.Module(body=[replacement_node]).code
+    # Fast path: a top-level def/class can be spliced into the source text using
+    # ast line positions, skipping the LibCST round-trip of the whole file.
+    if not lexical_chain and kind in ("def", "func", "class"):
+        spliced = _splice_top_level(content, target_name, replacement_node)
+        if spliced is not None:
+            return spliced, True
 
+    # Perform the replacement using only the replacement_node (already parsed above)
     transformer = ReplaceDeclaration(
         target_name=target_name,
         lexical_chain=lexical_chain or [],
-        new_code=single_node_code,
         kind=kind,
+        replacement_node=replacement_node,
     )
-    module = cst.parse_module(content)
+    module = _parse_source(content)
     new_module = module.visit(transformer)
 
     # Primary path result
@@ -774,6 +875,84 @@ def replace_block(content: str,
     return content, False
 
 
+def _splice_top_level(content: str, target_name: str,
+                      replacement_node: cst.BaseStatement) -> Optional[str]:
+    """
+    Replace top-level def/class declarations named `target_name` by splicing text.
+    The first match (including its decorators and any indented comments trailing
+    its body) is replaced in place by `replacement_node`, rendered with the file's
+    own indentation and newline; any later duplicates are removed together with
+    the blank and comment lines leading into them, as a LibCST removal would.
+
+    Returns:
+        The new source, or None if `content` doesn't parse or has no such declaration.
+    """
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return None
+
+    lines = content.split('\n')
+
+    def _is_blank(line):
+        return not line.strip()
+
+    def _is_indented_comment(line):
+        return line[:1] in (' ', '\t') and line.lstrip().startswith('#')
+
+    spans = []  # list[(start_idx, end_idx)] as 0-based, end-exclusive line indices
+    for node in tree.body:
+        if (isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                and node.name == target_name):
+            start = (node.decorator_list[0].lineno if node.decorator_list else node.lineno) - 1
+            end = node.end_lineno
+            # comments indented under the body belong to it, even past blank lines
+            probe = end
+            while probe < len(lines) and (_is_blank(lines[probe]) or _is_indented_comment(lines[probe])):
+                probe += 1
+                if _is_indented_comment(lines[probe - 1]):
+                    end = probe
+            spans.append((start, end))
+    if not spans:
+        return None
+
+    indent = _detect_indent(tree, lines)
+    newline = '\r\n' if '\r\n' in content else '\n'
+    rendered = cst.Module(body=[replacement_node], default_indent=indent,
+                          default_newline=newline).code
+    new_lines = rendered.replace('\r\n', '\n').strip('\n').split('\n')
+    if newline == '\r\n':
+        new_lines = [line + '\r' for line in new_lines]
+
+    # Work backwards so earlier line indices stay valid
+    for i in range(len(spans) - 1, -1, -1):
+        start_idx, end_idx = spans[i]
+        if i == 0:
+            lines[start_idx:end_idx] = new_lines
+        else:
+            prev_end = spans[i - 1][1]
+            while (start_idx > prev_end
+                   and (_is_blank(lines[start_idx - 1]) or lines[start_idx - 1].startswith('#'))):
+                start_idx -= 1
+            del lines[start_idx:end_idx]
+    return '\n'.join(lines)
+
+
+def _detect_indent(tree: ast.Module, lines: List[str]) -> str:
+    """
+    The file's indentation unit: the leading whitespace of the first top-level
+    block body that starts on its own line (what LibCST takes as default_indent).
+    """
+    for node in tree.body:
+        body = getattr(node, 'body', None)
+        if isinstance(body, list) and body and body[0].lineno > node.lineno:
+            line = lines[body[0].lineno - 1]
+            indent = line[:len(line) - len(line.lstrip(' \t'))]
+            if indent:
+                return indent
+    return '    '
+
+
 def insert_block(content: str,
                  new_code: str,
                  target_name: Optional[str] = None,
@@ -792,13 +971,13 @@ def insert_block(content: str,
         Modified content with inserted code
     """
     # Parse the new code to determine what we're inserting
-    mod = cst.parse_module(new_code)
+    mod = _parse_snippet(new_code)
     if len(mod.body) != 1:
         raise ValueError("new_code must contain exactly one top-level def/class.")
 
     node = mod.body[0]
 
-    module = cst.parse_module(content)
+    module = _parse_source(content)
 
     if not lexical_chain:
         # Top-level insertion - find the right place before executable code
@@ -931,7 +1110,8 @@ def modification_description(description_text):
     
     logging.debug(f"Added modification description: {description_text}")
 
-def apply_modification_set(modifications, auto_rollback_on_failure=True, auto_commit=None, commit_message=None):
+def apply_modification_set(modifications, auto_rollback_on_failure=True, auto_commit=None, commit_message=None,
+                           rollback=True):
     """
     Apply a set of modifications with rollback support
     
@@ -940,6 +1120,7 @@ def apply_modification_set(modifications, auto_rollback_on_failure=True, auto_co
         auto_rollback_on_failure: If True, automatically rollback on any failure
         auto_commit: If True, force commit even if no files tracked. If None, use existing logic.
         commit_message: Override commit message. If None, use accumulated descriptions.
+        rollback: If False, skip all git operations (no rollback point, no commit, no rollback on failure)
         
     Returns:
         GitRollbackManager: Manager instance for manual rollback operations
@@ -960,7 +1141,8 @@ def apply_modification_set(modifications, auto_rollback_on_failure=True, auto_co
     # Register the newly added helpers:
     
     # Create rollback point - this will raise if it fails
-    rollback_info = rollback_manager.create_rollback_point("Before LLM modifications")
+    if rollback:
+        rollback_info = rollback_manager.create_rollback_point("Before LLM modifications")
     
     # Process modifications and build commit message
     accumulated_descriptions = []
@@ -978,8 +1160,9 @@ def apply_modification_set(modifications, auto_rollback_on_failure=True, auto_co
     
     try:
         # Apply all non-description modifications
-        for func, args, kwargs in other_modifications:
-            print(func.__name__)
+        for func, args, kwargs in _batch_declares(other_modifications):
+            for name in _op_names(func, args):
+                print(name)
             func(*args, **kwargs)
         
         # Determine if we should commit
@@ -990,7 +1173,7 @@ def apply_modification_set(modifications, auto_rollback_on_failure=True, auto_co
             should_commit = True
         
         # Create final commit if needed
-        if should_commit:
+        if should_commit and rollback:
             final_commit_message = commit_message
             if not final_commit_message:
                 final_commit_message = rollback_manager.get_accumulated_message()
@@ -1000,13 +1183,16 @@ def apply_modification_set(modifications, auto_rollback_on_failure=True, auto_co
             rollback_manager.create_rollback_point(final_commit_message, force_commit=True)
         
         logging.info("All modifications completed successfully")
-        rollback_manager.show_rollback_options()
+        if rollback:
+            rollback_manager.show_rollback_options()
         return rollback_manager
         
     except Exception as e:
         logging.error(f"Modifications failed: {e}")
         
-        if auto_rollback_on_failure:
+        if not rollback:
+            logging.info("Rollback disabled - leaving changes in place")
+        elif auto_rollback_on_failure:
             logging.info("Auto-rolling back due to failure...")
             rollback_manager.hard_rollback()
         else:
@@ -1029,6 +1215,45 @@ def apply_modification_set(modifications, auto_rollback_on_failure=True, auto_co
         if hasattr(update_header, '_rollback_manager'):
             del update_header._rollback_manager
 
+def _batch_declares(modifications):
+    """
+    Coalesce declare()/update_header() calls into one _declare_batch() call per
+    file, so each file is read and written once. Within an uninterrupted run of
+    such calls, edits are grouped by file (keeping their order per file) even
+    when calls on different files are interleaved; each batch sits where its
+    file's first edit was. Any other modification ends the run, and is passed
+    through unchanged.
+    """
+    batched = []
+    run = {}
+    for func, args, kwargs in modifications:
+        edit = None
+        if func is declare and not kwargs and 2 <= len(args) <= 3:
+            edit = (args[1], args[2] if len(args) == 3 else None)
+        elif func is update_header and not kwargs and len(args) == 2:
+            edit = (_HEADER_EDIT, args[1])
+        if edit is not None:
+            key = os.path.normcase(os.path.abspath(args[0]))
+            if key in run:
+                run[key][1].append(edit)
+            else:
+                run[key] = (args[0], [edit])
+                batched.append((_declare_batch, run[key], {}))
+        else:
+            run = {}
+            batched.append((func, args, kwargs))
+    return batched
+
+def _op_names(func, args):
+    """
+    Names of the modifications a (possibly batched) call stands for, one per
+    original operation, so progress output matches what the user wrote.
+    """
+    if func is _declare_batch:
+        return [update_header.__name__ if target is _HEADER_EDIT else declare.__name__
+                for target, _ in args[1]]
+    return [func.__name__]
+
 # Interactive rollback interface
 def interactive_rollback():
     """Interactive interface for rollback operations"""
@@ -1092,10 +1317,60 @@ def open_with_mkdir(filepath, mode='w', **kwargs):
     # Open and return the file object
     return open(filepath, mode=mode, **kwargs)
 
+def _atomic_write(file_path, data, original=None):
+    """
+    Write `data` to `file_path` atomically: write a sibling temp file, fsync it,
+    then os.replace() it over the target so a crash never leaves a half-written file.
+    A symlinked `file_path` is resolved first, so the link's target is replaced and
+    the link itself survives; an existing target's permission bits are copied over.
+    If `original` (the content previously read) equals `data`, nothing is written,
+    which also leaves the file's mtime untouched.
+
+    Returns:
+        bool: True if the file was written, False if the write was skipped
+    """
+    if original is not None and data == original:
+        logging.debug(f"{file_path} unchanged, skipping write")
+        return False
+
+    target = os.path.realpath(file_path)
+    tmp = tempfile.NamedTemporaryFile('w', dir=os.path.dirname(target),
+                                      prefix='.' + os.path.basename(target) + '.',
+                                      suffix='.tmp', delete=False)
+    try:
+        with tmp as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # NamedTemporaryFile is created 0600; keep the original file's permissions
+        if os.path.exists(target):
+            os.chmod(tmp.name, stat.S_IMODE(os.stat(target).st_mode))
+        os.replace(tmp.name, target)
+    except BaseException:
+        if os.path.exists(tmp.name):
+            os.remove(tmp.name)
+        raise
+    return True
+
 def update_file(file_path, file_content, make_executable=False):
-    if os.path.exists(file_path):
-        remove_file(file_path)
-    create_file(file_path, file_content, make_executable=make_executable)
+    """Replace a file's content via _atomic_write, so a crash never loses the file.
+    The existing file's permission bits are kept (make_executable only adds the exec
+    bits) and a symlink is written through, not replaced; a missing file is created
+    with create_file()"""
+    if not os.path.exists(file_path):
+        create_file(file_path, file_content, make_executable=make_executable)
+        return
+
+    _atomic_write(file_path, file_content)
+
+    if make_executable:
+        current_permissions = os.stat(file_path).st_mode
+        os.chmod(file_path, current_permissions | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    if hasattr(create_file, '_rollback_manager'):
+        create_file._rollback_manager.track_file(file_path)
+
+    logging.debug(f"Updated {file_path}")
 
 def create_file(file_path, file_content, make_executable=True):
     """Create a file
@@ -1105,8 +1380,6 @@ def create_file(file_path, file_content, make_executable=True):
         file_content: Content of the script
         make_executable: If True, set executable permissions (Unix/Linux/Mac)
     """
-    import stat
-    
     #with open(file_path, 'w') as f:
     with open_with_mkdir(file_path, 'w') as f:
         f.write(file_content)
@@ -1129,9 +1402,6 @@ Addition to code_mod_defs.py to support update_header modifications
 This adds the ability to modify the module header section of Python files
 """
 
-import libcst as cst
-from typing import List, Optional, Tuple
-import re
 
 def update_header(file_path: str, header_content: str):
     """
@@ -1157,8 +1427,7 @@ def update_header(file_path: str, header_content: str):
     
     new_content = replace_update_header(content, header_content)
     
-    with open(file_path, 'w') as f:
-        f.write(new_content)
+    _atomic_write(file_path, new_content, original=content)
 
 
 def replace_update_header(content: str, new_header: str) -> str:
@@ -1173,7 +1442,7 @@ def replace_update_header(content: str, new_header: str) -> str:
         Modified file content with new header
     """
     try:
-        module = cst.parse_module(content)
+        module = _parse_source(content)
     except Exception as e:
         # If CST parsing fails, fall back to regex-based approach
         return _replace_header_regex_fallback(content, new_header)
@@ -1215,7 +1484,7 @@ def replace_update_header(content: str, new_header: str) -> str:
     # Parse the parseable portion of new header
     try:
         if parseable_header.strip():
-            new_header_module = cst.parse_module(parseable_header)
+            new_header_module = _parse_snippet(parseable_header)
             new_header_stmts = new_header_module.body
         else:
             new_header_stmts = []
@@ -1255,6 +1524,10 @@ def _is_main_block(stmt: cst.If) -> bool:
     return False
 
 
+_TOP_LEVEL_DEF_RE = re.compile(r'^(def|class)\s+\w+')
+_MAIN_GUARD_RE = re.compile(r"^if\s+__name__\s*==\s*['\"]__main__['\"]")
+
+
 def _replace_header_regex_fallback(content: str, new_header: str) -> str:
     """
     Fallback method using regex when CST parsing fails.
@@ -1270,13 +1543,13 @@ def _replace_header_regex_fallback(content: str, new_header: str) -> str:
         stripped = line.strip()
         
         # Look for function or class definitions at start of line (no indentation)
-        if re.match(r'^(def|class)\s+\w+', stripped):
+        if _TOP_LEVEL_DEF_RE.match(stripped):
             if first_def_line is None:
                 first_def_line = i
                 break
         
         # Look for __main__ block
-        if re.match(r"^if\s+__name__\s*==\s*['\"]__main__['\"]", stripped):
+        if _MAIN_GUARD_RE.match(stripped):
             if main_block_line is None:
                 main_block_line = i
     
@@ -1298,7 +1571,7 @@ def _replace_header_with_raw_text(content: str, new_header: str, split_index: Op
         return new_header
     
     try:
-        module = cst.parse_module(content)
+        module = _parse_source(content)
         remaining_stmts = module.body[split_index:]
         remaining_code = cst.Module(body=remaining_stmts).code
         return new_header + remaining_code
@@ -1364,9 +1637,29 @@ def declare(file_path, target_path, new_code=None):
     Notes:
       * Uses AST parsing to properly identify top-level declarations, avoiding
         issues with blank lines within function bodies or complex decorators.
+
+    Returns:
+        str: The file's new content (as written), so callers need not re-read it
+    """
+    return _declare_batch(file_path, [(target_path, new_code)])
+
+
+# Target marker for an update_header() edit folded into a _declare_batch() run
+_HEADER_EDIT = object()
+
+
+def _declare_batch(file_path, edits):
+    """
+    Apply several declare() edits to one file with a single read and a single write.
+
+    Args:
+        file_path: Path to the Python file to modify
+        edits: List of (target_path, new_code) tuples, applied in order. A
+            target_path of _HEADER_EDIT replaces the module header with new_code.
+
+    Returns:
+        str: The file's content after all edits
     """
-    import ast
-    
     logging.debug(f'file: {file_path}')
 
     # Track file for git operations BEFORE modifying it
@@ -1376,6 +1669,87 @@ def declare(file_path, target_path, new_code=None):
     with open(file_path, 'r') as f:
         content = f.read()
 
+    new_content = _apply_edits(content, edits)
+
+    _atomic_write(file_path, new_content, original=content)
+    return new_content
+
+
+def _apply_edits(content, edits):
+    """
+    Apply _declare_batch()-style (target_path, new_code) edits to source text
+    in memory and return the result; no file is read or written.
+    """
+    for target_path, new_code in edits:
+        if target_path is _HEADER_EDIT:
+            content = replace_update_header(content, new_code)
+        else:
+            content = _declare_source(content, target_path, new_code)
+    return content
+
+
+@functools.lru_cache(maxsize=256)
+def _split_declarations(src: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Split new_code into its top-level declarations using AST parsing, which avoids
+    issues with blank lines within function bodies or complex decorators.
+    Memoized on the snippet text; SyntaxError propagates and is not cached.
+
+    Returns:
+        tuple of (name, code_text) pairs in source order, decorators included
+    """
+    tree = ast.parse(src)
+
+    decls = []
+    
+    # Only look at direct children of the module
+    for node in tree.body:
+        name = None
+        start_line = node.lineno
+        
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            name = node.name
+            # Include decorators in the start line
+            if node.decorator_list:
+                start_line = node.decorator_list[0].lineno
+        elif isinstance(node, ast.ClassDef):
+            name = node.name
+            # Include decorators in the start line  
+            if node.decorator_list:
+                start_line = node.decorator_list[0].lineno
+        elif isinstance(node, ast.Assign):
+            if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                name = node.targets[0].id
+        elif isinstance(node, ast.AnnAssign):
+            if isinstance(node.target, ast.Name):
+                name = node.target.id
+        
+        if name and hasattr(node, 'end_lineno'):
+            end_line = node.end_lineno or node.lineno
+            decls.append((name, start_line, end_line))
+    
+    # Extract code text for each declaration
+    lines = src.splitlines()
+    result = []
+    for name, start_line, end_line in decls:
+        start_idx = start_line - 1
+        end_idx = end_line
+        
+        if start_idx >= 0 and end_idx <= len(lines):
+            code_lines = lines[start_idx:end_idx]
+            code_text = '\n'.join(code_lines)
+            if not code_text.endswith('\n'):
+                code_text += '\n'
+            result.append((name, code_text))
+    
+    return tuple(result)
+
+
+def _declare_source(content, target_path, new_code=None):
+    """
+    Apply one declare() edit to source text and return the new source.
+    See declare() for the semantics of *target_path* and *new_code*.
+    """
     target_name, lexical_chain = parse_lexical_chain(target_path)
 
     # ----- DELETE fast-path -----
@@ -1385,124 +1759,13 @@ def declare(file_path, target_path, new_code=None):
             logging.error(
                 f"Error removing {target_name}: target not found at chain {'.'.join(lexical_chain) or '<module>'}"
             )
-        with open(file_path, 'w') as f:
-            f.write(new_content)
-        return
-
-    # Helper: Use AST to properly identify top-level declarations
-    def _extract_declarations_ast(src: str):
-        """Extract top-level declarations using AST parsing."""
-        try:
-            tree = ast.parse(src)
-        except SyntaxError as e:
-            logging.warning(f"declare(): Could not parse new_code as valid Python: {e}")
-            return []
-        
-        decls = []  # list[(name, start_line, end_line)]
-        
-        for node in ast.walk(tree):
-            # Only consider top-level nodes (those directly under Module)
-            if not isinstance(getattr(node, 'parent', None), (type(None), ast.Module)):
-                continue
-                
-            name = None
-            if isinstance(node, ast.FunctionDef):
-                name = node.name
-            elif isinstance(node, ast.AsyncFunctionDef):
-                name = node.name  
-            elif isinstance(node, ast.ClassDef):
-                name = node.name
-            elif isinstance(node, ast.Assign):
-                # Handle simple assignments like "x = value"
-                if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
-                    name = node.targets[0].id
-            elif isinstance(node, ast.AnnAssign):
-                # Handle annotated assignments like "x: int = value"
-                if isinstance(node.target, ast.Name):
-                    name = node.target.id
-            
-            if name and hasattr(node, 'lineno') and hasattr(node, 'end_lineno'):
-                decls.append((name, node.lineno, node.end_lineno or node.lineno))
-        
-        # Sort by line number and extract code text for each declaration
-        decls.sort(key=lambda x: x[1])
-        lines = src.splitlines()
-        
-        result = []
-        for name, start_line, end_line in decls:
-            # Convert to 0-based indexing
-            start_idx = start_line - 1
-            end_idx = end_line  # end_lineno is inclusive, so we don't subtract 1
-            
-            if start_idx >= 0 and end_idx <= len(lines):
-                code_lines = lines[start_idx:end_idx]
-                code_text = '\n'.join(code_lines)
-                if not code_text.endswith('\n'):
-                    code_text += '\n'
-                result.append((name, code_text))
-        
-        return result
+        return new_content
 
-    # Add parent references to AST nodes for top-level detection
-    def _add_parent_refs(node, parent=None):
-        node.parent = parent
-        for child in ast.iter_child_nodes(node):
-            _add_parent_refs(child, node)
-
-    # Modified extraction that properly sets parent references
-    def _extract_declarations_with_parents(src: str):
-        try:
-            tree = ast.parse(src)
-            _add_parent_refs(tree)
-        except SyntaxError as e:
-            logging.warning(f"declare(): Could not parse new_code as valid Python: {e}")
-            return []
-        
-        decls = []
-        
-        # Only look at direct children of the module
-        for node in tree.body:
-            name = None
-            start_line = node.lineno
-            
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                name = node.name
-                # Include decorators in the start line
-                if node.decorator_list:
-                    start_line = node.decorator_list[0].lineno
-            elif isinstance(node, ast.ClassDef):
-                name = node.name
-                # Include decorators in the start line  
-                if node.decorator_list:
-                    start_line = node.decorator_list[0].lineno
-            elif isinstance(node, ast.Assign):
-                if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
-                    name = node.targets[0].id
-            elif isinstance(node, ast.AnnAssign):
-                if isinstance(node.target, ast.Name):
-                    name = node.target.id
-            
-            if name and hasattr(node, 'end_lineno'):
-                end_line = node.end_lineno or node.lineno
-                decls.append((name, start_line, end_line))
-        
-        # Extract code text for each declaration
-        lines = src.splitlines()
-        result = []
-        for name, start_line, end_line in decls:
-            start_idx = start_line - 1
-            end_idx = end_line
-            
-            if start_idx >= 0 and end_idx <= len(lines):
-                code_lines = lines[start_idx:end_idx]
-                code_text = '\n'.join(code_lines)
-                if not code_text.endswith('\n'):
-                    code_text += '\n'
-                result.append((name, code_text))
-        
-        return result
-
-    decls = _extract_declarations_with_parents(new_code)
+    try:
+        decls = _split_declarations(new_code)
+    except SyntaxError as e:
+        logging.warning(f"declare(): Could not parse new_code as valid Python: {e}")
+        decls = ()
 
     # If we only found one declaration, fall back to the original single-target behavior
     if len(decls) <= 1:
@@ -1522,9 +1785,7 @@ def declare(file_path, target_path, new_code=None):
             if not was_replaced:
                 new_content = insert_block(content, new_code, target_name=target_name, lexical_chain=lexical_chain)
 
-        with open(file_path, 'w') as f:
-            f.write(new_content)
-        return
+        return new_content
 
     # Multi-declaration path:
     # Apply first declaration to the explicit target; additional ones share the same chain.
@@ -1564,8 +1825,7 @@ def declare(file_path, target_path, new_code=None):
     for nm, code_text in rest_decls:
         new_content = _apply_one(new_content, nm, code_text)
 
-    with open(file_path, 'w') as f:
-        f.write(new_content)
+    return new_content
 
 # Example usage
 if __name__ == "__main__":
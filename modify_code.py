@@ -1,6 +1,7 @@
 #!/bin/env python
+import os
 import sys
-from pathlib import Path
+import mmap
 from typing import List, Tuple, Any
 import re
 
@@ -16,40 +17,66 @@ from code_mod_defs import (
     make_directory,
     remove_file,
     update_header,
+    interactive_rollback,
     # add others here as you introduce them
 )
-_HEADER_RE = re.compile(r'^MMM\s+([A-Za-z_][A-Za-z0-9_]*)\s+MMM\s*')
+# Block header line, matched over the raw (mmapped) file bytes
+_HEADER_RE = re.compile(rb'^MMM[^\S\n]+([A-Za-z_][A-Za-z0-9_]*)[^\S\n]+MMM[^\n]*\n?', re.M)
+_HEADER_PREFIX = b"MMM"
+# Section separator line, and its escaped form for a literal '@@@@@@' line
+_SECTION_SEP = b"@@@@@@"
+_SECTION_SEP_LINE = _SECTION_SEP + b"\n"
+_ESCAPED_SEP = b"\\" + _SECTION_SEP
+_TRUE_STRS = frozenset(("true", "1", "yes", "y"))
+_FALSE_STRS = frozenset(("false", "0", "no", "n"))
 def _parse_bool(s: str) -> bool:
     s = s.strip().lower()
-    if s in {"true", "1", "yes", "y"}:
-        return True
-    if s in {"false", "0", "no", "n"}:
-        return False
     # default: treat non-empty as True
-    return bool(s)
+    return s in _TRUE_STRS or (s not in _FALSE_STRS and bool(s))
 
 def _split_sections(block_lines: List[str]) -> List[str]:
     """
     Split a block's lines into sections using a line that is exactly '@@@@@@'
     as a separator. Keep inner newlines; strip a single trailing newline.
     """
-    sections: List[List[str]] = [[]]
-    for ln in block_lines:
-        if ln[:7] == "@@@@@@\n":
-            sections.append([])
+    return _split_block("".join(block_lines).encode("utf-8"))
+
+def _split_block(data: bytes) -> List[str]:
+    """
+    Split a block's raw (newline-normalized) bytes on '@@@@@@' separator lines
+    and decode each section. A line starting with '\\@@@@@@' is unescaped to a
+    literal '@@@@@@'. Splitting on bytes means separators are never decoded.
+    """
+    if _SECTION_SEP not in data:
+        # common single-section block: no separators and nothing to unescape
+        return [(data[:-1] if data.endswith(b"\n") else data).decode("utf-8")]
+
+    sep = _SECTION_SEP_LINE
+    out: List[bytes] = []
+    start = 0
+    while True:
+        if data.startswith(sep, start):
+            cut = start                     # separator right at the section start
         else:
-            if ln[:7] == '\\@@@@@@':    # literal @@@@@@ must be escaped
-                ln = ln[1:]
-            sections[-1].append(ln)
-    out: List[str] = []
-    for sec in sections:
-        txt = "".join(sec)
-        # strip a single trailing newline, keep interior newlines intact
-        if txt.endswith("\n"):
-            txt = txt[:-1]
-        out.append(txt)
-    return out
+            cut = data.find(b"\n" + sep, start)
+            if cut < 0:
+                break
+            cut += 1                        # keep the newline with the section
+        out.append(data[start:cut])
+        start = cut + len(sep)
+    out.append(data[start:])
 
+    sections: List[str] = []
+    for sec in out:
+        if _ESCAPED_SEP in sec:             # literal @@@@@@ must be escaped
+            if sec.startswith(_ESCAPED_SEP):
+                sec = sec[1:]
+            sec = sec.replace(b"\n" + _ESCAPED_SEP, b"\n" + _SECTION_SEP)
+        # strip a single trailing newline, keep interior newlines intact
+        if sec.endswith(b"\n"):
+            sec = sec[:-1]
+        sections.append(sec.decode("utf-8"))
+    return sections
 
 def main():
     if len(sys.argv) != 2:
@@ -62,23 +89,153 @@ def main():
     
     manager = apply_modification_set(modifications)
     print(f"\nModifications complete. Run 'python {sys.argv[0]} rollback' for rollback options.")
+# Extend this map as you add more supported operations
+_FUNC_TABLE = {
+    "modification_description": modification_description,
+    "create_file": create_file,
+    "move_file": move_file,
+    "declare": declare,
+    "update_declaration": declare,  # Add this line as synonym
+    "remove_declaration": declare,  # Add this line as synonym
+    "update_file": update_file,
+    "make_directory": make_directory,
+    "remove_file": remove_file,
+    "update_header": update_header,
+}
 def _resolve_func(name: str):
-    # Extend this map as you add more supported operations
-    table = {
-        "modification_description": modification_description,
-        "create_file": create_file,
-        "move_file": move_file,
-        "declare": declare,
-        "update_declaration": declare,  # Add this line as synonym
-        "remove_declaration": declare,  # Add this line as synonym
-        "update_file": update_file,
-        "make_directory": make_directory,
-        "remove_file": remove_file,
-        "update_header": update_header,
-    }
-    if name not in table:
+    fn = _FUNC_TABLE.get(name)
+    if fn is None:
         raise ValueError(f"Unknown modification function: {name}")
-    return table[name]
+    return fn
+def _iter_headers(buf):
+    """
+    Yield _HEADER_RE matches in buf, in order. Candidate lines are located with
+    a plain bytes find() on the 'MMM' prefix and only those are handed to the
+    regex, so ordinary payload lines never enter the regex engine.
+    """
+    header_match = _HEADER_RE.match
+    find = buf.find
+    if buf[:len(_HEADER_PREFIX)] == _HEADER_PREFIX:
+        m = header_match(buf, 0)
+        if m:
+            yield m
+    needle = b"\n" + _HEADER_PREFIX
+    pos = find(needle)
+    while pos >= 0:
+        m = header_match(buf, pos + 1)
+        if m:
+            yield m
+        pos = find(needle, pos + 1)
+
+def _read_fd(fd: int, size: int) -> bytes:
+    """Read everything from fd, starting with one read() of the expected size."""
+    chunks = [os.read(fd, max(size, 1 << 16))]
+    while chunks[-1]:
+        chunks.append(os.read(fd, 1 << 16))
+    return b"".join(chunks)
+
+def _iter_blocks(path: str):
+    """
+    Yield (func_name, block_bytes) for each 'MMM <func_name> MMM' block in the file.
+    The file is mmapped and headers are found on the raw bytes, so only one
+    block at a time is materialized; decoding is left to _split_block.
+    """
+    # raw fd rather than open(): no FileIO/BufferedReader layers, and the
+    # fstat size lets the unmappable fallback read in one go
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+    try:
+        size = os.fstat(fd).st_size
+        try:
+            buf = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty or non-regular files can't be mapped
+            buf = _read_fd(fd, size)
+    finally:
+        # the mapping stays valid after its descriptor is closed
+        os.close(fd)
+    try:
+        yield from _iter_buffer_blocks(buf)
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+
+def _iter_buffer_blocks(buf):
+    """Yield (func_name, block_bytes) for each 'MMM <func_name> MMM' block in buf."""
+    headers = list(_iter_headers(buf))
+    for k, m in enumerate(headers):
+        end = headers[k + 1].start() if k + 1 < len(headers) else len(buf)
+        block = buf[m.end():end]
+        # normalize newlines the way text-mode reading did; '\r' is never
+        # part of a multi-byte UTF-8 sequence, so this is safe on raw bytes
+        block = block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        yield m.group(1).decode('ascii'), block
+
+# Per-operation argument parsers: (func_name, sections) -> (args, kwargs).
+# For known funcs we coerce argument types appropriately.
+def _parse_description_args(func_name: str, sections: List[str]):
+    if not sections:
+        raise ValueError("modification_description requires one section (the description).")
+    return (sections[0],), {}
+
+def _parse_file_content_args(func_name: str, sections: List[str]):
+    # create_file and update_file share a signature
+    if len(sections) < 2:
+        raise ValueError(f"{func_name} requires at least 2 sections: path, content, [make_executable].")
+    path_arg = sections[0].strip()
+    content_arg = sections[1]  # preserve newlines
+    make_exec = _parse_bool(sections[2]) if len(sections) >= 3 else False
+    return (path_arg, content_arg), {"make_executable": make_exec}
+
+def _parse_move_args(func_name: str, sections: List[str]):
+    if len(sections) < 2:
+        raise ValueError("move_file requires 2 sections: src, dst.")
+    return (sections[0].strip(), sections[1].strip()), {}
+
+def _parse_declare_args(func_name: str, sections: List[str]):
+    # Also used for 'update_declaration' and 'remove_declaration', which resolve to declare
+    if len(sections) < 2:
+        raise ValueError(f"{func_name} requires 2 sections: file_path, name, content (or None for deletion).")
+    file_path = sections[0].strip()
+    name = sections[1].strip()
+    content = sections[2] if len(sections)==3 and sections[2].strip() else None  # treat empty content as None for deletion
+    return (file_path, name, content), {}
+
+def _parse_make_directory_args(func_name: str, sections: List[str]):
+    if len(sections) < 1:
+        raise ValueError("make_directory requires 1 section: path.")
+    return (sections[0].strip(),), {}
+
+def _parse_remove_file_args(func_name: str, sections: List[str]):
+    if len(sections) < 1:
+        raise ValueError("remove_file requires at least 1 section: path, [recursive].")
+    path_arg = sections[0].strip()
+    recursive = _parse_bool(sections[1]) if len(sections) >= 2 else False
+    return (path_arg,), {"recursive": recursive}
+
+def _parse_update_header_args(func_name: str, sections: List[str]):
+    if len(sections) < 2:
+        raise ValueError("update_header requires 2 sections: file_path, header_content.")
+    file_path_arg = sections[0].strip()
+    header_content_arg = sections[1]  # preserve newlines and formatting
+    return (file_path_arg, header_content_arg), {}
+
+def _parse_fallback_args(func_name: str, sections: List[str]):
+    # Unknown signature: all sections as positional strings
+    return tuple(sections), {}
+
+_ARG_PARSERS = {
+    "modification_description": _parse_description_args,
+    "create_file": _parse_file_content_args,
+    "update_file": _parse_file_content_args,
+    "move_file": _parse_move_args,
+    "declare": _parse_declare_args,
+    "update_declaration": _parse_declare_args,
+    "remove_declaration": _parse_declare_args,
+    "make_directory": _parse_make_directory_args,
+    "remove_file": _parse_remove_file_args,
+    "update_header": _parse_update_header_args,
+}
+
 def parse_modification_file(path: str):
     """
     Format:
@@ -94,100 +251,25 @@ def parse_modification_file(path: str):
     Unknown funcs: treat all sections as positional strings.
     Returns: List[Tuple[callable, tuple(args), dict(kwargs)]]
     """
-    text = Path(path).read_text()
-    lines = text.splitlines(keepends=True)
-
-    i = 0
-    entries: List[Tuple[Any, tuple, dict]] = []
-
-    while i < len(lines):
-        m = _HEADER_RE.match(lines[i])
-        if not m:
-            i += 1
-            continue
+    return _parse_blocks(_iter_blocks(path))
 
-        func_name = m.group(1)
-        i += 1
+def parse_modification_string(text: str):
+    """
+    Parse modification-file text that is already in memory; same format and
+    return value as parse_modification_file(), without touching the filesystem.
+    """
+    return _parse_blocks(_iter_buffer_blocks(text.encode("utf-8")))
 
-        # collect until next header or EOF
-        block: List[str] = []
-        while i < len(lines) and not _HEADER_RE.match(lines[i]):
-            block.append(lines[i])
-            i += 1
+def _parse_blocks(blocks):
+    """Turn (func_name, block_bytes) pairs into (callable, args, kwargs) entries."""
+    entries: List[Tuple[Any, tuple, dict]] = []
 
-        sections = _split_sections(block)
+    for func_name, block in blocks:
+        sections = _split_block(block)
         fn = _resolve_func(func_name)
 
-        # Special handling for known signatures:
-        if fn is modification_description:
-            if not sections:
-                raise ValueError("modification_description requires one section (the description).")
-            args = (sections[0],)
-            kwargs = {}
-
-        elif fn is create_file:
-            if len(sections) < 2:
-                raise ValueError("create_file requires at least 2 sections: path, content, [make_executable].")
-            path_arg = sections[0].strip()
-            content_arg = sections[1]  # preserve newlines
-            make_exec = _parse_bool(sections[2]) if len(sections) >= 3 else False
-            args = (path_arg, content_arg)
-            kwargs = {"make_executable": make_exec}
-
-        elif fn is update_file:
-            if len(sections) < 2:
-                raise ValueError("update_file requires at least 2 sections: path, content, [make_executable].")
-            path_arg = sections[0].strip()
-            content_arg = sections[1]  # preserve newlines
-            make_exec = _parse_bool(sections[2]) if len(sections) >= 3 else False
-            args = (path_arg, content_arg)
-            kwargs = {"make_executable": make_exec}
-
-        elif fn is move_file:
-            if len(sections) < 2:
-                raise ValueError("move_file requires 2 sections: src, dst.")
-            src = sections[0].strip()
-            dst = sections[1].strip()
-            args = (src, dst)
-            kwargs = {}
-
-        elif fn is declare:  # This handles 'declare', 'update_declaration', and 'remove_declaration' since they resolve to the same function
-            if len(sections) < 2:
-                raise ValueError(f"{func_name} requires 2 sections: file_path, name, content (or None for deletion).")
-            file_path = sections[0].strip()
-            name = sections[1].strip()
-            content = sections[2] if len(sections)==3 and sections[2].strip() else None  # treat empty content as None for deletion
-            args = (file_path, name, content)
-            kwargs = {}
-
-        elif fn is make_directory:
-            if len(sections) < 1:
-                raise ValueError("make_directory requires 1 section: path.")
-            path_arg = sections[0].strip()
-            args = (path_arg,)
-            kwargs = {}
-
-        elif fn is remove_file:
-            if len(sections) < 1:
-                raise ValueError("remove_file requires at least 1 section: path, [recursive].")
-            path_arg = sections[0].strip()
-            recursive = _parse_bool(sections[1]) if len(sections) >= 2 else False
-            args = (path_arg,)
-            kwargs = {"recursive": recursive}
-
-        elif fn is update_header:
-            if len(sections) < 2:
-                raise ValueError("update_header requires 2 sections: file_path, header_content.")
-            file_path_arg = sections[0].strip()
-            header_content_arg = sections[1]  # preserve newlines and formatting
-            args = (file_path_arg, header_content_arg)
-            kwargs = {}
-
-        else:
-            # Fallback: all sections as positional strings
-            args = tuple(sections)
-            kwargs = {}
-
+        parse_args = _ARG_PARSERS.get(func_name, _parse_fallback_args)
+        args, kwargs = parse_args(func_name, sections)
         entries.append((fn, args, kwargs))
 
     if not entries:
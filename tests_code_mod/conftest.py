@@ -1,9 +1,7 @@
 import os
+import re
 import sys
-import subprocess
-import tempfile
 import shutil
-import contextlib
 from pathlib import Path
 
 import pytest
@@ -13,28 +11,61 @@ PROJECT_ROOT = Path("/mnt/data")
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-@contextlib.contextmanager
-def chdir(path: Path):
-    prev = Path.cwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(prev)
+from helpers import _git
 
-@pytest.fixture()
-def tmp_git_repo(tmp_path, monkeypatch):
-    """Initialize a temporary git repo with configured identity and an initial commit.
-    Yields: (repo_path: Path, chdir_ctx: contextmanager)
+_SHM = Path("/dev/shm")
+
+def pytest_configure(config):
+    """Put tmp_path/tmp_path_factory on RAM-backed tmpfs when it is available.
+
+    The suite writes (and fsyncs, via _atomic_write) lots of tiny files; on tmpfs
+    that never touches a disk. An explicit --basetemp always wins.
     """
-    repo = tmp_path / "repo"
-    repo.mkdir()
-    subprocess.check_call(["git", "init"], cwd=repo)
-    subprocess.check_call(["git", "config", "user.name", "Test User"], cwd=repo)
-    subprocess.check_call(["git", "config", "user.email", "test@example.com"], cwd=repo)
+    if config.option.basetemp is None and _SHM.is_dir() and os.access(_SHM, os.W_OK):
+        config.option.basetemp = str(_SHM / f"pyvibepatcher-pytest-{os.getpid()}")
+        config._shm_basetemp = config.option.basetemp
+
+def pytest_unconfigure(config):
+    # A basetemp we chose is ours to remove; don't leave test files sitting in RAM
+    basetemp = getattr(config, "_shm_basetemp", None)
+    if basetemp:
+        shutil.rmtree(basetemp, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def shared_tmp(tmp_path_factory):
+    """One directory for the whole session, instead of a fresh mkdtemp per test."""
+    return tmp_path_factory.mktemp("code_mod")
+
+@pytest.fixture()
+def py_file(shared_tmp, request):
+    """A .py path in shared_tmp named after the requesting test, removed afterwards."""
+    p = shared_tmp / (re.sub(r"\W", "_", request.node.name) + ".py")
+    yield p
+    p.unlink(missing_ok=True)
+
+@pytest.fixture(scope="session")
+def _base_git_repo(tmp_path_factory):
+    """Build the initial repo once per session; tmp_git_repo hands out copies of it."""
+    repo = tmp_path_factory.mktemp("base_repo")
+    _git(repo, "init")
+    # Write the identity straight into .git/config instead of spawning
+    # `git config` twice; git reads it the same way.
+    with open(repo / ".git" / "config", "a") as cfg:
+        cfg.write("[user]\n\tname = Test User\n\temail = test@example.com\n")
 
     (repo / "README.md").write_text("# temp\n")
-    subprocess.check_call(["git", "add", "README.md"], cwd=repo)
-    subprocess.check_call(["git", "commit", "-m", "init"], cwd=repo)
+    _git(repo, "add", "README.md")
+    _git(repo, "commit", "-m", "init")
+    return repo
+
+@pytest.fixture()
+def tmp_git_repo(_base_git_repo, tmp_path, monkeypatch):
+    """A private copy of a git repo with configured identity and an initial commit,
+    made the cwd for the duration of the test (monkeypatch restores it).
+    Yields: repo_path: Path
+    """
+    repo = tmp_path / "repo"
+    shutil.copytree(_base_git_repo, repo, symlinks=True)
+    monkeypatch.chdir(repo)
 
-    yield repo, chdir
+    yield repo
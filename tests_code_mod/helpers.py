@@ -0,0 +1,83 @@
+"""
+Plain helpers shared by the tests in this directory (fixtures live in conftest.py).
+pytest.ini puts this directory on the path, so tests import them with `from helpers import ...`.
+"""
+import os
+import re
+import functools
+import subprocess
+from pathlib import Path
+
+def _git(repo: Path, *args: str) -> None:
+    """Run one git command in repo, discarding its output."""
+    subprocess.run(["git", "-C", str(repo), *args], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+def write_bytes(path, data: bytes) -> None:
+    """Write data to path with a bare fd: no TextIOWrapper and no encode step."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+@functools.lru_cache(maxsize=None)
+def _landmark_re(needles):
+    # The leading lookahead stops only where some needle starts; one optional
+    # lookahead group per needle then reports every needle matching there, so
+    # needles that overlap or share a prefix are each seen.
+    escaped = [re.escape(n) for n in needles]
+    return re.compile(f"(?=(?:{'|'.join(escaped)}))" + "".join(f"(?=({e})?)" for e in escaped))
+
+def compile_landmarks(needles, absent=()):
+    """
+    Compile a {key: substring} mapping (or an iterable of substrings, each its
+    own key), plus substrings that must not appear (keyed absent_0, absent_1, ...),
+    into (keys, pattern) for iter_landmarks().
+    """
+    if not isinstance(needles, dict):
+        needles = {n: n for n in needles}
+    groups = dict(needles, **{f"absent_{i}": v for i, v in enumerate(absent)})
+    return tuple(groups), _landmark_re(tuple(groups.values()))
+
+def iter_landmarks(text, compiled):
+    """Yield (key, offset) for every occurrence of every landmark in text, overlaps included."""
+    keys, pat = compiled
+    for m in pat.finditer(text):
+        for key, hit in zip(keys, m.groups()):
+            if hit is not None:
+                yield key, m.start()
+
+def first_positions(text, compiled):
+    """Map each landmark key to the offset of its first occurrence in text (-1 if none)."""
+    positions = dict.fromkeys(compiled[0], -1)
+    for key, offset in iter_landmarks(text, compiled):
+        if positions[key] < 0:
+            positions[key] = offset
+    return positions
+
+def assert_contains_all(text: str, needles, absent=()) -> None:
+    """Assert every needle occurs in text and no absent string does, in one regex pass."""
+    needles, absent = tuple(needles), tuple(absent)
+    if not needles and not absent:
+        return
+    positions = first_positions(text, compile_landmarks(needles, absent))
+    missing = [k for k, at in positions.items() if at < 0 and not k.startswith("absent_")]
+    assert not missing, f"missing from content: {missing}"
+    unexpected = [absent[int(k[7:])] for k, at in positions.items()
+                  if at >= 0 and k.startswith("absent_")]
+    assert not unexpected, f"unexpectedly in content: {unexpected}"
+
+def git_commit_file(path, message, repo="."):
+    """Stage one file and commit it (add and commit can't share a git process)."""
+    _git(Path(repo), "add", "--", str(path))
+    _git(Path(repo), "commit", "-q", "-m", message)
+
+def git_head_commit(repo="."):
+    """(hash, subject) of HEAD's commit, both from one `git log -1`."""
+    out = subprocess.run(["git", "-C", str(repo), "log", "-1", "--format=%H%n%s"],
+                         check=True, capture_output=True, text=True).stdout
+    sha, _, subject = out.rstrip("\n").partition("\n")
+    return sha, subject
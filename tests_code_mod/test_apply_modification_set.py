@@ -2,44 +2,102 @@ from pathlib import Path
 import subprocess
 import pytest
 
+from helpers import git_head_commit
+
 from code_mod_defs import apply_modification_set, create_file, move_file, remove_file, modification_description
 
 def test_apply_modification_set_success(tmp_git_repo):
-    repo, chdir = tmp_git_repo
-    with chdir(repo):
-        Path("dst").mkdir(parents=True, exist_ok=True)
-        mods = [
-            (modification_description, ("create and move files",), {}),
-            (create_file, ("src/a.txt", "A",), {"make_executable": False}),
-            (create_file, ("src/b.txt", "B",), {"make_executable": False}),
-            (move_file, ("src/a.txt", "dst/a.txt"), {}),
-            (remove_file, ("src", True), {}),
-        ]
-        mgr = apply_modification_set(mods, auto_rollback_on_failure=True)
-        assert Path("dst/a.txt").exists()
-        assert not Path("src").exists()
-        assert mgr.rollback_data.get("commit_hash")
+    Path("dst").mkdir(parents=True, exist_ok=True)
+    mods = [
+        (modification_description, ("create and move files",), {}),
+        (create_file, ("src/a.txt", "A",), {"make_executable": False}),
+        (create_file, ("src/b.txt", "B",), {"make_executable": False}),
+        (move_file, ("src/a.txt", "dst/a.txt"), {}),
+        (remove_file, ("src", True), {}),
+    ]
+    mgr = apply_modification_set(mods, auto_rollback_on_failure=True)
+    assert Path("dst/a.txt").exists()
+    assert not Path("src").exists()
+    assert mgr.rollback_data.get("commit_hash")
 
 def test_apply_modification_set_failure_rolls_back(tmp_git_repo):
-    repo, chdir = tmp_git_repo
-    with chdir(repo):
-        initial_commit = subprocess.check_output(
-            ["git", "rev-parse", "HEAD"], text=True
-        ).strip()
-
-        mods = [
-            (create_file, ("x.txt", "X",), {"make_executable": False}),
-            (move_file, ("does_not_exist.txt", "y.txt"), {}),
-        ]
-        with pytest.raises(Exception):
-            apply_modification_set(mods, auto_rollback_on_failure=True)
-
-        # HEAD should remain the same (no new commit was added)
-        head_after = subprocess.check_output(
-            ["git", "rev-parse", "HEAD"], text=True
-        ).strip()
-        assert head_after == initial_commit
-
-        # The file may exist untracked; ensure it was NOT staged/committed
-        tracked = subprocess.check_output(["git", "ls-files", "x.txt"], text=True).strip()
-        assert tracked == ""
+    initial_commit, _ = git_head_commit()
+
+    mods = [
+        (create_file, ("x.txt", "X",), {"make_executable": False}),
+        (move_file, ("does_not_exist.txt", "y.txt"), {}),
+    ]
+    with pytest.raises(Exception):
+        apply_modification_set(mods, auto_rollback_on_failure=True)
+
+    # HEAD should remain the same (no new commit was added)
+    head_after, _ = git_head_commit()
+    assert head_after == initial_commit
+
+    # The file may exist untracked; ensure it was NOT staged/committed
+    tracked = subprocess.check_output(["git", "ls-files", "x.txt"], text=True).strip()
+    assert tracked == ""
+
+def test_consecutive_declares_on_same_file_are_batched():
+    from code_mod_defs import _batch_declares, _declare_batch, declare
+    mods = [
+        (declare, ("a.py", "f", "def f():\n    pass\n"), {}),
+        (declare, ("a.py", "g", None), {}),
+        (modification_description, ("desc",), {}),
+        (declare, ("a.py", "h", "h = 1\n"), {}),
+        (declare, ("b.py", "h", "h = 1\n"), {}),
+    ]
+    batched = _batch_declares(mods)
+    assert [m[0] for m in batched] == [_declare_batch, modification_description, _declare_batch, _declare_batch]
+    assert batched[0][1] == ("a.py", [("f", "def f():\n    pass\n"), ("g", None)])
+
+def test_interleaved_files_are_batched_per_file():
+    from code_mod_defs import _batch_declares, _declare_batch, declare, make_directory
+    mods = [
+        (declare, ("a.py", "f", "f = 1\n"), {}),
+        (declare, ("b.py", "g", "g = 1\n"), {}),
+        (declare, ("./a.py", "h", None), {}),
+        (make_directory, ("d",), {}),
+        (declare, ("a.py", "k", "k = 1\n"), {}),
+    ]
+    batched = _batch_declares(mods)
+    assert batched == [
+        (_declare_batch, ("a.py", [("f", "f = 1\n"), ("h", None)]), {}),
+        (_declare_batch, ("b.py", [("g", "g = 1\n")]), {}),
+        (make_directory, ("d",), {}),
+        (_declare_batch, ("a.py", [("k", "k = 1\n")]), {}),
+    ]
+
+def test_update_header_joins_declare_batch():
+    from code_mod_defs import _batch_declares, _declare_batch, _HEADER_EDIT, declare, update_header
+    mods = [
+        (update_header, ("a.py", "import os"), {}),
+        (declare, ("a.py", "f", "def f():\n    pass\n"), {}),
+        (update_header, ("a.py", "import sys"), {}),
+    ]
+    batched = _batch_declares(mods)
+    assert batched == [(_declare_batch, ("a.py", [(_HEADER_EDIT, "import os"),
+                                                  ("f", "def f():\n    pass\n"),
+                                                  (_HEADER_EDIT, "import sys")]), {})]
+
+def test_apply_modification_set_without_rollback(tmp_path):
+    plain = tmp_path / "plain.txt"
+    mods = [
+        (modification_description, ("no git here",), {}),
+        (create_file, (str(plain), "P",), {"make_executable": False}),
+    ]
+    mgr = apply_modification_set(mods, rollback=False)
+    assert plain.read_text() == "P"
+    assert mgr.rollback_data == {}
+
+def test_progress_output_names_original_operations(tmp_path, capsys):
+    from code_mod_defs import declare, update_header
+    target = tmp_path / "m.py"
+    target.write_text("import os\n")
+    mods = [
+        (update_header, (str(target), "import sys"), {}),
+        (declare, (str(target), "f", "def f():\n    pass\n"), {}),
+        (declare, (str(target), "g", "g = 1\n"), {}),
+    ]
+    apply_modification_set(mods, rollback=False)
+    assert capsys.readouterr().out.split() == ["update_header", "declare", "declare"]
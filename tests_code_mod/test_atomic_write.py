@@ -0,0 +1,46 @@
+import os
+import stat
+
+from code_mod_defs import _atomic_write, declare, update_file
+
+def test_atomic_write_preserves_mode_and_leaves_no_temp(tmp_path):
+    p = tmp_path / "tool.py"
+    p.write_text("x = 1\n")
+    os.chmod(p, 0o755)
+    assert _atomic_write(str(p), "x = 2\n", original="x = 1\n")
+    assert p.read_text() == "x = 2\n"
+    assert stat.S_IMODE(os.stat(p).st_mode) == 0o755
+    assert [f.name for f in tmp_path.iterdir()] == ["tool.py"]
+
+def test_declare_skips_write_when_unchanged(tmp_path):
+    p = tmp_path / "same.py"
+    p.write_text("def foo():\n    return 1\n")
+    os.utime(p, ns=(0, 0))
+    declare(str(p), "foo", "def foo():\n    return 1\n")
+    assert os.stat(p).st_mtime_ns == 0
+
+def test_update_file_replaces_atomically_and_sets_exec_bit(tmp_path):
+    p = tmp_path / "run.sh"
+    p.write_text("echo old\n")
+    os.chmod(p, 0o644)
+    update_file(str(p), "echo new\n", make_executable=True)
+    assert p.read_text() == "echo new\n"
+    assert stat.S_IMODE(os.stat(p).st_mode) == 0o755
+    assert [f.name for f in tmp_path.iterdir()] == ["run.sh"]
+
+def test_update_file_keeps_existing_mode(tmp_path):
+    p = tmp_path / "secret.txt"
+    p.write_text("old\n")
+    os.chmod(p, 0o600)
+    update_file(str(p), "new\n")
+    assert p.read_text() == "new\n"
+    assert stat.S_IMODE(os.stat(p).st_mode) == 0o600
+
+def test_update_file_writes_through_symlink(tmp_path):
+    real = tmp_path / "real.py"
+    real.write_text("x = 1\n")
+    link = tmp_path / "link.py"
+    link.symlink_to(real.name)
+    update_file(str(link), "x = 2\n")
+    assert link.is_symlink()
+    assert real.read_text() == "x = 2\n"
@@ -1,5 +1,4 @@
 import textwrap
-from pathlib import Path
 
 from code_mod_defs import declare, parse_lexical_chain
 
@@ -11,11 +10,12 @@ def test_parse_lexical_chain_nested():
     name, chain = parse_lexical_chain("A.b.c")
     assert name == "c" and chain == ["A", "b"]
 
-def test_replace_insert_delete_roundtrip(tmp_path):
-    p = tmp_path / "m.py"
+def test_replace_insert_delete_roundtrip(py_file):
+    p = py_file
+    path = str(p)
     p.write_text("")
     # insert a top-level def
-    declare(str(p), "foo", textwrap.dedent("""
+    declare(path, "foo", textwrap.dedent("""
     def foo():
         return 1
     """))
@@ -23,7 +23,7 @@ def test_replace_insert_delete_roundtrip(tmp_path):
     assert "def foo" in s and "return 1" in s
 
     # replace the def
-    declare(str(p), "foo", textwrap.dedent("""
+    declare(path, "foo", textwrap.dedent("""
     def foo():
         return 2
     """))
@@ -31,19 +31,20 @@ def test_replace_insert_delete_roundtrip(tmp_path):
     assert "return 2" in s and "return 1" not in s
 
     # delete the def
-    declare(str(p), "foo", None)
+    declare(path, "foo", None)
     s = p.read_text()
     assert "def foo" not in s
 
-def test_nested_insertion_and_deletion(tmp_path):
-    p = tmp_path / "n.py"
+def test_nested_insertion_and_deletion(py_file):
+    p = py_file
+    path = str(p)
     p.write_text(textwrap.dedent("""
     class A:
         def b(self):
             x = 1
     """))
     # insert a method c into A
-    declare(str(p), "A.c", textwrap.dedent("""
+    declare(path, "A.c", textwrap.dedent("""
     def c(self):
         return 'ok'
     """))
@@ -51,18 +52,98 @@ def test_nested_insertion_and_deletion(tmp_path):
     assert "def c(self)" in s
 
     # delete method b
-    declare(str(p), "A.b", None)
+    declare(path, "A.b", None)
     s = p.read_text()
     assert "def b(" not in s
 
-def test_assignment_replace_and_delete(tmp_path):
-    p = tmp_path / "v.py"
+def test_assignment_replace_and_delete(py_file):
+    p = py_file
+    path = str(p)
     p.write_text("x = 1\ny = 2\n")
     # replace assignment to x
-    declare(str(p), "x", "x = 42\n")
+    declare(path, "x", "x = 42\n")
     s = p.read_text()
     assert "x = 42" in s and "y = 2" in s
     # delete y
-    declare(str(p), "y", None)
+    declare(path, "y", None)
     s = p.read_text()
     assert "y = 2" not in s
+
+def test_top_level_class_replaced_in_place(py_file):
+    p = py_file
+    p.write_text(textwrap.dedent("""
+    class Foo:
+        def a(self):
+            return 1
+
+    def after():
+        pass
+    """))
+    declare(str(p), "Foo", textwrap.dedent("""
+    class Foo:
+        def b(self):
+            return 2
+    """))
+    s = p.read_text()
+    assert s.count("class Foo") == 1
+    assert "def b(self)" in s and "def a(self)" not in s
+    assert s.index("class Foo") < s.index("def after")
+
+def test_identical_snippet_gives_identical_results(tmp_path):
+    code = "def helper():\n    return 'h'\n"
+    results = []
+    for name in ("a.py", "b.py"):
+        p = tmp_path / name
+        p.write_text("x = 1\n")
+        declare(str(p), "helper", code)
+        results.append(p.read_text())
+    assert results[0] == results[1]
+    assert "def helper():" in results[0]
+
+def test_method_replacement_is_repeatable(py_file):
+    p = py_file
+    p.write_text("class A:\n    def b(self):\n        return 1\n")
+    declare(str(p), "A.b", "def b(self):\n    return 2\n")
+    s = p.read_text()
+    assert "return 2" in s and "return 1" not in s
+    declare(str(p), "A.b", "def b(self):\n    return 2\n")
+    assert p.read_text() == s
+
+def test_declare_returns_written_content(py_file):
+    p = py_file
+    p.write_text("x = 1\n")
+    content = declare(str(p), "f", "def f():\n    return x\n")
+    assert content == p.read_text()
+    assert "def f():" in content
+
+def test_header_replacement_is_repeatable():
+    from code_mod_defs import replace_update_header
+    src = "import os\n\ndef f():\n    pass\n"
+    first = replace_update_header(src, "import sys\n")
+    assert replace_update_header(src, "import sys\n") == first
+    assert replace_update_header(src, "import json\n") != first
+    assert "import sys" in first and "def f():" in first
+
+def test_top_level_replacement_keeps_two_space_indent(py_file):
+    p = py_file
+    p.write_text("class A:\n  def m(self):\n    return 1\n\ndef f():\n  return 1\n")
+    declare(str(p), "f", "def f():\n  if True:\n    return 2\n")
+    assert p.read_text() == "class A:\n  def m(self):\n    return 1\n\ndef f():\n  if True:\n    return 2\n"
+
+def test_top_level_replacement_keeps_tab_indent(py_file):
+    p = py_file
+    p.write_text("def f():\n\treturn 1\n\ndef g():\n\tpass\n")
+    declare(str(p), "f", "def f():\n    if True:\n        return 2\n")
+    assert p.read_text() == "def f():\n\tif True:\n\t\treturn 2\n\ndef g():\n\tpass\n"
+
+def test_top_level_replacement_drops_trailing_body_comments(py_file):
+    p = py_file
+    p.write_text("def f():\n    return 1\n    # old note\n\ndef g():\n    pass\n")
+    declare(str(p), "f", "def f():\n    return 2\n")
+    assert p.read_text() == "def f():\n    return 2\n\ndef g():\n    pass\n"
+
+def test_top_level_duplicate_removed_without_stray_lines(py_file):
+    p = py_file
+    p.write_text("def f():\n    return 1\n\n\n# second copy\ndef f():\n    return 9\n\n\ndef g():\n    pass\n")
+    declare(str(p), "f", "def f():\n    return 2\n")
+    assert p.read_text() == "def f():\n    return 2\n\n\ndef g():\n    pass\n"
@@ -4,7 +4,6 @@ Test case for declare deletion syntax with empty trailing sections
 Place this in: tests_code_mod/test_declare_deletion_syntax.py
 """
 import textwrap
-from pathlib import Path
 from modify_code import parse_modification_file
 
 
@@ -128,10 +127,10 @@ def test_simple_deletion_debug(tmp_path):
     # Try to delete the class
     declare(str(test_file), "GPUSlot", None)
     
+    content = test_file.read_text()
     print("After deletion:")
-    print(repr(test_file.read_text()))
+    print(repr(content))
     
-    content = test_file.read_text()
     assert "class GPUSlot:" not in content
     assert "def function():" in content  # Should remain
 
@@ -142,6 +141,7 @@ def test_declare_deletion_actually_deletes(tmp_path):
     
     # Create test file with multiple declarations
     test_file = tmp_path / "gpu_manager.py"
+    path = str(test_file)
     test_file.write_text(textwrap.dedent("""
     class GPUSlot:
         def __init__(self, device_id):
@@ -168,9 +168,9 @@ def test_declare_deletion_actually_deletes(tmp_path):
     # Create modification file content manually for testing
     modifications = [
         (modification_description, ("Remove old declarations and update can_allocate",), {}),
-        (declare, (str(test_file), "GPUSlot", None), {}),  # Delete class
-        (declare, (str(test_file), "GPUResourceManager._initialize_slots", None), {}),  # Delete method
-        (declare, (str(test_file), "GPUResourceManager.can_allocate", textwrap.dedent("""
+        (declare, (path, "GPUSlot", None), {}),  # Delete class
+        (declare, (path, "GPUResourceManager._initialize_slots", None), {}),  # Delete method
+        (declare, (path, "GPUResourceManager.can_allocate", textwrap.dedent("""
         def can_allocate(self, config: Config) -> bool:
             '''Check if configuration can likely be allocated based on memory estimates.'''
             required_memory = self.estimate_memory_requirement(config)
@@ -204,9 +204,9 @@ def test_declare_deletion_actually_deletes(tmp_path):
         
     except Exception as e:
         # If we're not in a git repo, just test the individual operations
-        declare(str(test_file), "GPUSlot", None)
-        declare(str(test_file), "GPUResourceManager._initialize_slots", None) 
-        declare(str(test_file), "GPUResourceManager.can_allocate", textwrap.dedent("""
+        declare(path, "GPUSlot", None)
+        declare(path, "GPUResourceManager._initialize_slots", None) 
+        declare(path, "GPUResourceManager.can_allocate", textwrap.dedent("""
         def can_allocate(self, config: Config) -> bool:
             '''Check if configuration can likely be allocated based on memory estimates.'''
             required_memory = self.estimate_memory_requirement(config)
@@ -1,10 +1,11 @@
 import textwrap
-from pathlib import Path
 import re
 
 import pytest
 from code_mod_defs import declare
 
+_CLASS_RE = re.compile(r'^(\s*)class\s+([A-Za-z_][A-Za-z0-9_]*)\b')
+
 def _count_in_class(source: str, class_name: str, needle: str) -> int:
     """Count occurrences of `needle` inside the lexical block of `class <class_name>:`.
 
@@ -18,27 +19,22 @@ def _count_in_class(source: str, class_name: str, needle: str) -> int:
     class_indent = 0
     count = 0
 
-    def leading_spaces(s: str) -> int:
-        return len(s) - len(s.lstrip(' '))
-
-    class_re = re.compile(rf'^\s*class\s+{re.escape(class_name)}\b')
-
     for line in lines:
         if not in_class:
-            if class_re.match(line):
+            m = _CLASS_RE.match(line)
+            if m and m.group(2) == class_name:
                 in_class = True
-                class_indent = leading_spaces(line)
+                class_indent = len(line) - len(line.lstrip(' '))
             continue
 
         # Once in the class: consider only lines that are more indented than the class header
-        if line.strip() == '':
+        stripped = line.lstrip(' ')
+        if stripped.strip() == '':
             # blank lines belong to the current block; continue
             pass
-        else:
-            indent = leading_spaces(line)
-            if indent <= class_indent:
-                # we've left the class block
-                break
+        elif len(line) - len(stripped) <= class_indent:
+            # we've left the class block
+            break
 
         if needle in line:
             count += 1
@@ -46,8 +42,8 @@ def _count_in_class(source: str, class_name: str, needle: str) -> int:
     return count
 
 
-def test_multi_declare_methods_same_base_chain(tmp_path):
-    p = tmp_path / "multi_class.py"
+def test_multi_declare_methods_same_base_chain(py_file):
+    p = py_file
     p.write_text(textwrap.dedent("""
     class A:
         class B:
@@ -72,8 +68,8 @@ def test_multi_declare_methods_same_base_chain(tmp_path):
     assert s.count("def bar(") == 1
 
 
-def test_multi_declare_top_level_functions(tmp_path):
-    p = tmp_path / "multi_top_level.py"
+def test_multi_declare_top_level_functions(py_file):
+    p = py_file
     p.write_text("")
     declare(str(p), "alpha", textwrap.dedent("""
     def alpha(): 
@@ -90,8 +86,8 @@ def test_multi_declare_top_level_functions(tmp_path):
     assert s.count("def beta(") == 1
 
 
-def test_multi_declare_assignments_in_class(tmp_path):
-    p = tmp_path / "multi_assign_class.py"
+def test_multi_declare_assignments_in_class(py_file):
+    p = py_file
     p.write_text(textwrap.dedent("""
     class C:
         pass
@@ -107,3 +103,23 @@ def test_multi_declare_assignments_in_class(tmp_path):
     assert _count_in_class(s, "C", "y = 20") == 1
     assert s.count("x = 10") == 1
     assert s.count("y = 20") == 1
+
+
+def test_split_declarations_is_stable_across_declares(tmp_path):
+    from code_mod_defs import _split_declarations
+    code = "def alpha():\n    return 1\n\ndef beta():\n    return 2\n"
+    assert _split_declarations(code) == (
+        ("alpha", "def alpha():\n    return 1\n"),
+        ("beta", "def beta():\n    return 2\n"),
+    )
+    for name in ("one.py", "two.py"):
+        p = tmp_path / name
+        p.write_text("")
+        declare(str(p), "alpha", code)
+        s = p.read_text()
+        assert s.count("def alpha(") == 1 and s.count("def beta(") == 1
+    # declaring must not disturb the (memoized) split of the same snippet
+    assert _split_declarations(code) == (
+        ("alpha", "def alpha():\n    return 1\n"),
+        ("beta", "def beta():\n    return 2\n"),
+    )
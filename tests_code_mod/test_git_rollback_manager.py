@@ -4,30 +4,72 @@ import subprocess
 from code_mod_defs import GitRollbackManager, create_file
 
 def test_create_rollback_points_no_changes(tmp_git_repo):
-    repo, chdir = tmp_git_repo
-    with chdir(repo):
-        mgr = GitRollbackManager()
-        info = mgr.create_rollback_point("snapshot")
-        assert "commit_hash" in info and info["was_clean"] is True
+    mgr = GitRollbackManager()
+    info = mgr.create_rollback_point("snapshot")
+    assert "commit_hash" in info and info["was_clean"] is True
 
 def test_commit_tracked_files_and_hard_rollback(tmp_git_repo):
-    repo, chdir = tmp_git_repo
-    with chdir(repo):
-        mgr = GitRollbackManager()
-        mgr.track_file("a.txt")
-        create_file._rollback_manager = mgr  # simulate apply_modification_set attaching tracking
-        create_file("a.txt", "hello", make_executable=False)
-
-        # Create rollback point commit that includes a.txt="hello"
-        info = mgr.create_rollback_point("after create", force_commit=True)
-        commit_after = mgr.get_current_commit()
-        assert commit_after == info["commit_hash"]
-
-        # Dirty the working tree
-        Path("a.txt").write_text("changed")
-
-        # Roll back to the rollback point commit (not HEAD~1)
-        ok = mgr.hard_rollback(info["commit_hash"])
-        assert ok
-        assert Path("a.txt").read_text() == "hello"
+    mgr = GitRollbackManager()
+    mgr.track_file("a.txt")
+    create_file._rollback_manager = mgr  # simulate apply_modification_set attaching tracking
+    create_file("a.txt", "hello", make_executable=False)
 
+    # Create rollback point commit that includes a.txt="hello"
+    info = mgr.create_rollback_point("after create", force_commit=True)
+    commit_after = mgr.get_current_commit()
+    assert commit_after == info["commit_hash"]
+
+    # Dirty the working tree
+    Path("a.txt").write_text("changed")
+
+    # Roll back to the rollback point commit (not HEAD~1)
+    ok = mgr.hard_rollback(info["commit_hash"])
+    assert ok
+    assert Path("a.txt").read_text() == "hello"
+
+def test_rollback_log_appends_and_loads_latest(tmp_path):
+    log = tmp_path / "rollback.jsonl"
+    mgr = GitRollbackManager(rollback_file=str(log))
+    for n in range(3):
+        mgr.rollback_data = {"commit_hash": f"c{n}", "padding": "x" * 5000}
+        mgr._save_rollback_data()
+    assert len(log.read_text().splitlines()) == 3
+
+    fresh = GitRollbackManager(rollback_file=str(log))
+    fresh._load_rollback_data()
+    assert fresh.rollback_data["commit_hash"] == "c2"
+
+def test_rollback_log_is_compacted(tmp_path):
+    log = tmp_path / "rollback.jsonl"
+    mgr = GitRollbackManager(rollback_file=str(log))
+    for n in range(GitRollbackManager.MAX_LOG_ENTRIES + 5):
+        mgr.rollback_data = {"commit_hash": f"c{n}"}
+        mgr._save_rollback_data()
+    lines = log.read_text().splitlines()
+    assert len(lines) == GitRollbackManager.MAX_LOG_ENTRIES
+    assert '"c5"' in lines[0] and f'"c{GitRollbackManager.MAX_LOG_ENTRIES + 4}"' in lines[-1]
+
+def test_legacy_rollback_file_is_loaded(tmp_path):
+    (tmp_path / "rollback.json").write_text('{"commit_hash": "legacy"}')
+    mgr = GitRollbackManager(rollback_file=str(tmp_path / "rollback.jsonl"))
+    mgr._load_rollback_data()
+    assert mgr.rollback_data["commit_hash"] == "legacy"
+
+def test_current_commit_and_non_ascii_branch(tmp_git_repo):
+    subprocess.check_call(["git", "checkout", "-q", "-b", "fünf"])
+    mgr = GitRollbackManager()
+    head = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    assert mgr.get_current_commit() == head
+    assert mgr.get_current_branch() == "fünf"
+
+def test_rollback_point_stages_tracked_files_in_batch(tmp_git_repo):
+    mgr = GitRollbackManager()
+    Path("a.txt").write_text("a")
+    Path("b.txt").write_text("b")
+    Path("README.md").unlink()
+    for p in ("a.txt", "b.txt", "README.md", "never_existed.txt"):
+        mgr.track_file(p)
+    mgr.create_rollback_point("batch", force_commit=True)
+    tree = set(subprocess.check_output(
+        ["git", "ls-tree", "--name-only", "HEAD"], text=True).splitlines())
+    assert tree == {"a.txt", "b.txt"}
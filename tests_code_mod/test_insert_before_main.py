@@ -1,13 +1,12 @@
 import textwrap
-from pathlib import Path
+import pytest
+
 from code_mod_defs import declare
 
-def test_declare_inserts_before_main_block(tmp_path):
-    """Test that new declarations are inserted before if __name__ == '__main__' block."""
-    p = tmp_path / "with_main.py"
-    
-    # Create a file with existing code and a __main__ block
-    p.write_text(textwrap.dedent("""
+@pytest.fixture(scope="module")
+def with_main_bytes():
+    """Module with functions, a constant and a trailing __main__ block."""
+    return textwrap.dedent("""
     import os
     import sys
     
@@ -20,7 +19,41 @@ def test_declare_inserts_before_main_block(tmp_path):
         print("Running main")
         existing_function()
         sys.exit(0)
-    """))
+    """).encode()
+
+@pytest.fixture(scope="module")
+def with_exec_bytes():
+    """Module whose declarations are followed by bare executable statements."""
+    return textwrap.dedent("""
+    def existing():
+        pass
+    
+    # Some executable code at module level
+    print("Module loading")
+    result = existing()
+    print(f"Result: {result}")
+    """).encode()
+
+@pytest.fixture(scope="module")
+def replace_with_main_bytes():
+    """Module with a replaceable function ahead of its __main__ block."""
+    return textwrap.dedent("""
+    def target_function():
+        return "original"
+    
+    OTHER_VAR = "unchanged"
+    
+    if __name__ == '__main__':
+        print("Main block")
+        target_function()
+    """).encode()
+
+def test_declare_inserts_before_main_block(py_file, with_main_bytes):
+    """Test that new declarations are inserted before if __name__ == '__main__' block."""
+    p = py_file
+    
+    # Create a file with existing code and a __main__ block
+    p.write_bytes(with_main_bytes)
     
     # Insert a new function
     declare(str(p), "new_function", textwrap.dedent("""
@@ -29,34 +62,25 @@ def test_declare_inserts_before_main_block(tmp_path):
     """))
     
     content = p.read_text()
-    lines = content.split('\n')
     
     # Find the positions of key elements
-    new_func_line = next(i for i, line in enumerate(lines) if 'def new_function' in line)
-    main_line = next(i for i, line in enumerate(lines) if 'if __name__ == ' in line)
+    new_func_pos = content.index('def new_function')
+    main_pos = content.index('if __name__ == ')
     
     # New function should be inserted before the __main__ block
-    assert new_func_line < main_line, f"new_function at line {new_func_line} should be before __main__ at line {main_line}"
+    assert new_func_pos < main_pos, f"new_function at offset {new_func_pos} should be before __main__ at offset {main_pos}"
     
     # Verify the __main__ block is still intact
     assert 'if __name__ == \'__main__\':' in content
     assert 'print("Running main")' in content
     assert 'sys.exit(0)' in content
 
-def test_declare_inserts_before_other_executable_code(tmp_path):
+def test_declare_inserts_before_other_executable_code(py_file, with_exec_bytes):
     """Test that new declarations are inserted before other executable statements."""
-    p = tmp_path / "with_exec.py"
+    p = py_file
     
     # Create a file with functions and trailing executable code
-    p.write_text(textwrap.dedent("""
-    def existing():
-        pass
-    
-    # Some executable code at module level
-    print("Module loading")
-    result = existing()
-    print(f"Result: {result}")
-    """))
+    p.write_bytes(with_exec_bytes)
     
     # Insert a new function
     declare(str(p), "new_function", textwrap.dedent("""
@@ -65,29 +89,16 @@ def test_declare_inserts_before_other_executable_code(tmp_path):
     """))
     
     content = p.read_text()
-    lines = content.split('\n')
-    
-    # Find positions
-    new_func_line = next(i for i, line in enumerate(lines) if 'def new_function' in line)
-    print_line = next(i for i, line in enumerate(lines) if 'print("Module loading")' in line)
     
     # New function should be before executable code
-    assert new_func_line < print_line, f"new_function should be inserted before executable code"
+    assert content.index('def new_function') < content.index('print("Module loading")'), \
+        "new_function should be inserted before executable code"
 
-def test_declare_replaces_preserves_main_block_position(tmp_path):
+def test_declare_replaces_preserves_main_block_position(py_file, replace_with_main_bytes):
     """Test that replacing a declaration doesn't move the __main__ block."""
-    p = tmp_path / "replace_with_main.py"
-    
-    p.write_text(textwrap.dedent("""
-    def target_function():
-        return "original"
+    p = py_file
     
-    OTHER_VAR = "unchanged"
-    
-    if __name__ == '__main__':
-        print("Main block")
-        target_function()
-    """))
+    p.write_bytes(replace_with_main_bytes)
     
     # Replace the existing function
     declare(str(p), "target_function", textwrap.dedent("""
@@ -96,15 +107,12 @@ def test_declare_replaces_preserves_main_block_position(tmp_path):
     """))
     
     content = p.read_text()
-    lines = content.split('\n')
     
     # Verify replacement happened
     assert 'return "replaced"' in content
     assert 'return "original"' not in content
     
     # Verify __main__ block is still at the end
-    target_line = next(i for i, line in enumerate(lines) if 'def target_function' in line)
-    main_line = next(i for i, line in enumerate(lines) if 'if __name__ == ' in line)
-    
-    assert target_line < main_line, "Replaced function should still be before __main__ block"
+    assert content.index('def target_function') < content.index('if __name__ == '), \
+        "Replaced function should still be before __main__ block"
     assert 'print("Main block")' in content
\ No newline at end of file
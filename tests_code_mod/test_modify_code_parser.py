@@ -1,3 +1,5 @@
+import pytest
+
 from modify_code import parse_modification_file
 
 SAMPLE = """\
@@ -17,12 +19,20 @@ path/to/file.txt
 new/place.txt
 """
 
-def test_parse_modification_file(tmp_path):
-    mfile = tmp_path / "mods.txt"
+@pytest.fixture(scope="module")
+def parsed_sample(tmp_path_factory):
+    """SAMPLE parsed once per module; tests must treat the entries as read-only."""
+    mfile = tmp_path_factory.mktemp("mods") / "mods.txt"
     mfile.write_text(SAMPLE)
-    mods = parse_modification_file(str(mfile))
-    funcs = [m[0].__name__ for m in mods]
-    assert funcs == ["modification_description", "create_file", "move_file"]
-    assert mods[1][1][0].strip() == "path/to/file.txt"
-    assert mods[1][1][1].strip() == "content here"
-    assert mods[2][1][1].strip() == "new/place.txt"
+    return parse_modification_file(str(mfile))
+
+EXPECTED = [
+    ("modification_description", ("Describe the change",), {}),
+    ("create_file", ("path/to/file.txt", "content here"), {"make_executable": False}),
+    ("move_file", ("path/to/file.txt", "new/place.txt"), {}),
+]
+
+def test_parse_modification_file(parsed_sample):
+    got = [(fn.__name__, tuple(a.strip() for a in args), kwargs)
+           for fn, args, kwargs in parsed_sample]
+    assert got == EXPECTED
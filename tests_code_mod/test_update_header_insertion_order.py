@@ -6,315 +6,289 @@ the header always comes first and declarations come after it.
 
 Place this in: tests_code_mod/test_update_header_insertion_order.py
 """
+import re
 import textwrap
-from pathlib import Path
 import pytest
-from code_mod_defs import apply_modification_set, modification_description, update_header, declare
+from helpers import compile_landmarks, iter_landmarks
+from code_mod_defs import apply_modification_set, declare, update_header
+
+
+# Source snippets, dedented once at import rather than in every test body
+ORDERING_SRC = textwrap.dedent("""
+import os
+OLD_CONFIG = "old"
+
+def existing_function():
+    return "exists"
+""").strip()
+
+MODERN_HEADER = textwrap.dedent("""
+#!/usr/bin/env python3
+'''Modern module with enhanced configuration'''
+import sys
+import logging
+from pathlib import Path
+
+# New configuration
+NEW_CONFIG = "modern"
+DEBUG = True
+
+# Initialize logging
+logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO)
+logger = logging.getLogger(__name__)
+""").strip()
+
+NEW_FUNCTION_SRC = textwrap.dedent("""
+def new_function():
+    '''Newly added function'''
+    logger.info("New function called")
+    return "new"
+""").strip()
+
+MULTI_FUNCTION_HEADER = textwrap.dedent("""
+#!/usr/bin/env python3
+'''Module with multiple new functions'''
+import json
+import requests
+
+API_BASE = "https://api.example.com"
+TIMEOUT = 30
+""").strip()
+
+FETCH_SRC = textwrap.dedent("""
+def fetch_data(endpoint):
+    '''Fetch data from API'''
+    url = f"{API_BASE}/{endpoint}"
+    response = requests.get(url, timeout=TIMEOUT)
+    return response.json()
+""").strip()
+
+PROCESS_SRC = textwrap.dedent("""
+def process_data(data):
+    '''Process API data'''
+    return {k: v for k, v in data.items() if v is not None}
+""").strip()
+
+WITH_MAIN_SRC = textwrap.dedent("""
+import sys
+
+if __name__ == '__main__':
+    print("Original main")
+""").strip()
+
+MAIN_HEADER = textwrap.dedent("""
+#!/usr/bin/env python3
+'''Application with main block'''
+import argparse
+import logging
+
+DEFAULT_LOG_LEVEL = "INFO"
+""").strip()
+
+SETUP_LOGGING_SRC = textwrap.dedent("""
+def setup_logging(level=DEFAULT_LOG_LEVEL):
+    '''Setup application logging'''
+    logging.basicConfig(level=getattr(logging, level))
+    return logging.getLogger(__name__)
+""").strip()
+
+IMPORT_ORDER_HEADER = textwrap.dedent("""
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''Module with proper import ordering'''
+
+# Standard library imports
+import os
+import sys
+from pathlib import Path
+
+# Third-party imports
+import requests
+import click
+
+# Configuration
+CONFIG_DIR = Path.home() / '.myapp'
+DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
+""").strip()
+
+INIT_CONFIG_SRC = textwrap.dedent("""
+def initialize_config():
+    '''Initialize application configuration'''
+    CONFIG_DIR.mkdir(exist_ok=True)
+    return CONFIG_DIR / 'config.json'
+""").strip()
+
+LEGACY_SRC = textwrap.dedent("""
+import old_module
+OLD_SETTING = "deprecated"
+
+def legacy_function():
+    return "legacy"
+""").strip()
+
+NEWEST_HEADER = textwrap.dedent("""
+import newest_module
+import another_module
+NEWEST_SETTING = 'v2'
+FINAL_CONFIG = True
+""").strip()
+
+
+# Line classifiers for the imports-before-functions check
+IMPORT_RE = re.compile(r'^\s*(?:import|from)\s')
+DEF_RE = re.compile(r'\bdef\s')
+
+
+def scan_source(content, pat):
+    """
+    Walk the content's lines once, collecting:
+      - each landmark key of a compile_landmarks() pattern mapped to the index
+        of the first line containing its substring (-1 if none)
+      - the index of the last import line (-1 if none)
+      - the index of the first line containing a def (-1 if none)
+    """
+    positions = dict.fromkeys(pat[0], -1)
+    last_import = first_function = -1
+    for i, line in enumerate(content.splitlines()):
+        for key, _ in iter_landmarks(line, pat):
+            if positions[key] < 0:
+                positions[key] = i
+        if IMPORT_RE.match(line):
+            last_import = i
+        if first_function < 0 and DEF_RE.search(line):
+            first_function = i
+    return positions, last_import, first_function
+
+
+# Ops are (target, code) pairs applied in order: declare(path, target, code), or
+# update_header(path, code) when the target is HEADER.
+HEADER = None
+
+
+def apply_ops(path, ops):
+    """Apply (target, code) ops to the file one public call at a time."""
+    for target, code in ops:
+        if target is HEADER:
+            update_header(path, code)
+        else:
+            declare(path, target, code)
+
+# (initial source, ops,
+#  landmark substrings by key plus substrings that must be absent, compiled once at import,
+#  chains of landmark keys that must appear in that order)
+ORDERING_CASES = [
+    pytest.param(
+        ORDERING_SRC,
+        [(HEADER, MODERN_HEADER), ("new_function", NEW_FUNCTION_SRC)],
+        compile_landmarks({'shebang': '#!/usr/bin/env python3',
+                           'import_sys': 'import sys',
+                           'config': 'NEW_CONFIG = "modern"',
+                           'logger': 'logger = logging.getLogger(__name__)',
+                           'new_func': 'def new_function():',
+                           'existing_func': 'def existing_function():'},
+                          absent=["import os", "OLD_CONFIG"]),
+        # shebang -> imports -> config -> logger -> new function, after the existing function
+        [('shebang', 'import_sys', 'config', 'logger', 'new_func'),
+         ('existing_func', 'new_func')],
+        id="declare_after_update_header_replacement",
+    ),
+    pytest.param(
+        "def old_func():\n    pass\n",
+        [(HEADER, MULTI_FUNCTION_HEADER), ("fetch_data", FETCH_SRC), ("process_data", PROCESS_SRC)],
+        compile_landmarks({'shebang': '#!/usr/bin/env python3',
+                           'api_base': 'API_BASE = ',
+                           'fetch_func': 'def fetch_data(',
+                           'process_func': 'def process_data(',
+                           'old_func': 'def old_func():'}),
+        # new functions in insertion order, after the header and the existing function
+        [('shebang', 'api_base', 'fetch_func', 'process_func'),
+         ('old_func', 'process_func')],
+        id="multiple_declares_after_update_header",
+    ),
+    pytest.param(
+        WITH_MAIN_SRC,
+        [(HEADER, MAIN_HEADER), ("setup_logging", SETUP_LOGGING_SRC)],
+        compile_landmarks({'shebang': '#!/usr/bin/env python3',
+                           'default_log': 'DEFAULT_LOG_LEVEL = ',
+                           'setup_func': 'def setup_logging(',
+                           'main_block': "if __name__ == '__main__':",
+                           'main_body': 'print("Original main")'}),
+        # functions go before the (preserved) __main__ block
+        [('shebang', 'default_log', 'setup_func', 'main_block', 'main_body')],
+        id="declare_insertion_respects_main_block",
+    ),
+    pytest.param(
+        "def existing():\n    pass\n",
+        [(HEADER, IMPORT_ORDER_HEADER), ("initialize_config", INIT_CONFIG_SRC)],
+        compile_landmarks({'shebang': '#!/usr/bin/env python3',
+                           'import_os': 'import os',
+                           'import_requests': 'import requests',
+                           'config_dir': 'CONFIG_DIR = ',
+                           'init_func': 'def initialize_config(',
+                           'existing_func': 'def existing():'}),
+        # standard imports, third-party imports, configuration, then new functions
+        [('shebang', 'import_os', 'import_requests', 'config_dir', 'init_func'),
+         ('existing_func', 'init_func')],
+        id="declare_never_before_imports",
+    ),
+    pytest.param(
+        # header -> declare -> declare -> header (should replace) -> declare
+        LEGACY_SRC,
+        [(HEADER, "import new_module\nNEW_SETTING = 'v1'"),
+         ("function_a", "def function_a():\n    return 'a'"),
+         ("function_b", "def function_b():\n    return 'b'"),
+         (HEADER, NEWEST_HEADER),
+         ("function_c", "def function_c():\n    return 'c'")],
+        compile_landmarks({'newest_import': 'import newest_module',
+                           'final_config': 'FINAL_CONFIG = True',
+                           'func_a': 'def function_a():',
+                           'func_b': 'def function_b():',
+                           'func_c': 'def function_c():',
+                           'legacy': 'def legacy_function():'},
+                          # old header and the first replacement header are both gone
+                          absent=["import old_module", "OLD_SETTING", "NEW_SETTING"]),
+        # final header first; legacy function, then new functions in declaration order
+        [('newest_import', 'final_config', 'legacy', 'func_a', 'func_b', 'func_c')],
+        id="complex_interleaved_operations",
+    ),
+]
 
 
 class TestModuleHeaderInsertionOrder:
     """Test that declarations respect module header boundaries"""
-    
-    def test_declare_after_update_header_replacement(self, tmp_path):
-        """Test that declare inserts after update_header when both are used"""
-        test_file = tmp_path / "ordering_test.py"
-        test_file.write_text(textwrap.dedent("""
-        import os
-        OLD_CONFIG = "old"
-        
-        def existing_function():
-            return "exists"
-        """).strip())
-        
-        # Apply both update_header and declare operations
-        modifications = [
-            (modification_description, ("Update header and add new function",), {}),
-            (update_header, (str(test_file), textwrap.dedent("""
-            #!/usr/bin/env python3
-            '''Modern module with enhanced configuration'''
-            import sys
-            import logging
-            from pathlib import Path
-            
-            # New configuration
-            NEW_CONFIG = "modern"
-            DEBUG = True
-            
-            # Initialize logging
-            logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO)
-            logger = logging.getLogger(__name__)
-            """).strip()), {}),
-            (declare, (str(test_file), "new_function", textwrap.dedent("""
-            def new_function():
-                '''Newly added function'''
-                logger.info("New function called")
-                return "new"
-            """).strip()), {}),
-        ]
-        
-        # Apply without git to avoid repository issues
-        update_header(str(test_file), modifications[1][1][1])
-
-        print("=== DEBUG: After update_header ===")
-        content_after_header = test_file.read_text()
-        for i, line in enumerate(content_after_header.split('\n')):
-            print(f"{i:2}: {line}")
-        declare(str(test_file), "new_function", modifications[2][1][2])  # Fixed: [2] not [1]
-        
-        content = test_file.read_text()
-        print("=== DEBUG: After declare ===")
-        for i, line in enumerate(content.split('\n')):
-            print(f"{i:2}: {line}")
-        print("=== END DEBUG ===")
-
-        lines = content.split('\n')
-        
-        # Find key elements
-        shebang_line = next((i for i, line in enumerate(lines) if line.startswith('#!/usr/bin/env python3')), -1)
-        import_sys_line = next((i for i, line in enumerate(lines) if 'import sys' in line), -1)
-        config_line = next((i for i, line in enumerate(lines) if 'NEW_CONFIG = "modern"' in line), -1)
-        logger_line = next((i for i, line in enumerate(lines) if 'logger = logging.getLogger(__name__)' in line), -1)
-        new_func_line = next((i for i, line in enumerate(lines) if 'def new_function():' in line), -1)
-        existing_func_line = next((i for i, line in enumerate(lines) if 'def existing_function():' in line), -1)
-        
-        # Verify order: shebang -> imports -> config -> logger -> new function -> existing function
-        assert shebang_line < import_sys_line, "Shebang should come before imports"
-        assert import_sys_line < config_line, "Imports should come before config"
-        assert config_line < logger_line, "Config should come before logger"
-        assert logger_line < new_func_line, "Header (logger) should come before new function"
-        assert existing_func_line < new_func_line, "Existing function should come before new function"
-        
-        # Verify old header elements are gone
-        assert "import os" not in content
-        assert "OLD_CONFIG" not in content
-        
-        # Verify new header elements are present
-        assert "#!/usr/bin/env python3" in content
-        assert "import sys" in content
-        assert "NEW_CONFIG = \"modern\"" in content
-        assert "logger = logging.getLogger(__name__)" in content
-        
-        # Verify functions are present
-        assert "def new_function():" in content
-        assert "def existing_function():" in content
-
-
-    def test_multiple_declares_after_update_header(self, tmp_path):
-        """Test multiple declare operations after update_header"""
-        test_file = tmp_path / "multi_declare.py"
-        test_file.write_text("def old_func():\n    pass\n")
-        
-        # Apply header first, then multiple declarations
-        update_header(str(test_file), textwrap.dedent("""
-        #!/usr/bin/env python3
-        '''Module with multiple new functions'''
-        import json
-        import requests
-        
-        API_BASE = "https://api.example.com"
-        TIMEOUT = 30
-        """).strip())
-        
-        declare(str(test_file), "fetch_data", textwrap.dedent("""
-        def fetch_data(endpoint):
-            '''Fetch data from API'''
-            url = f"{API_BASE}/{endpoint}"
-            response = requests.get(url, timeout=TIMEOUT)
-            return response.json()
-        """).strip())
-        
-        declare(str(test_file), "process_data", textwrap.dedent("""
-        def process_data(data):
-            '''Process API data'''
-            return {k: v for k, v in data.items() if v is not None}
-        """).strip())
-        
-        content = test_file.read_text()
-        lines = content.split('\n')
-        
-        # Find positions
-        shebang_pos = next((i for i, line in enumerate(lines) if line.startswith('#!/usr/bin/env python3')), -1)
-        api_base_pos = next((i for i, line in enumerate(lines) if 'API_BASE = ' in line), -1)
-        fetch_func_pos = next((i for i, line in enumerate(lines) if 'def fetch_data(' in line), -1)
-        process_func_pos = next((i for i, line in enumerate(lines) if 'def process_data(' in line), -1)
-        old_func_pos = next((i for i, line in enumerate(lines) if 'def old_func():' in line), -1)
-        
-        # Verify correct ordering
-        assert shebang_pos < api_base_pos, "Shebang should come before header constants"
-        assert api_base_pos < fetch_func_pos, "Header constants should come before new functions"
-        assert fetch_func_pos < process_func_pos, "Functions should be in insertion order"
-        assert old_func_pos < process_func_pos, "Existing functions should come before new functions"
-
-
-    def test_declare_insertion_respects_main_block(self, tmp_path):
-        """Test that declare inserts before __main__ block even after update_header"""
-        test_file = tmp_path / "with_main.py"
-        test_file.write_text(textwrap.dedent("""
-        import sys
-        
-        if __name__ == '__main__':
-            print("Original main")
-        """).strip())
-        
-        # Apply header and declaration
-        update_header(str(test_file), textwrap.dedent("""
-        #!/usr/bin/env python3
-        '''Application with main block'''
-        import argparse
-        import logging
-        
-        DEFAULT_LOG_LEVEL = "INFO"
-        """).strip())
-        
-        declare(str(test_file), "setup_logging", textwrap.dedent("""
-        def setup_logging(level=DEFAULT_LOG_LEVEL):
-            '''Setup application logging'''
-            logging.basicConfig(level=getattr(logging, level))
-            return logging.getLogger(__name__)
-        """).strip())
-        
-        content = test_file.read_text()
-        lines = content.split('\n')
-        
-        # Find positions
-        shebang_pos = next((i for i, line in enumerate(lines) if line.startswith('#!/usr/bin/env python3')), -1)
-        default_log_pos = next((i for i, line in enumerate(lines) if 'DEFAULT_LOG_LEVEL = ' in line), -1)
-        setup_func_pos = next((i for i, line in enumerate(lines) if 'def setup_logging(' in line), -1)
-        main_block_pos = next((i for i, line in enumerate(lines) if 'if __name__ == ' in line), -1)
-        
-        # Verify ordering
-        assert shebang_pos < default_log_pos, "Shebang should come first"
-        assert default_log_pos < setup_func_pos, "Header constants before functions"
-        assert setup_func_pos < main_block_pos, "Functions should come before __main__ block"
-        
-        # Verify __main__ block is preserved
-        assert "if __name__ == '__main__':" in content
-        assert "print(\"Original main\")" in content
-
-
-    def test_declare_never_before_imports(self, tmp_path):
-        """Test that declare never inserts before import statements"""
-        test_file = tmp_path / "import_order.py"
-        test_file.write_text("def existing():\n    pass\n")
-        
-        # Apply header with imports
-        update_header(str(test_file), textwrap.dedent("""
-        #!/usr/bin/env python3
-        # -*- coding: utf-8 -*-
-        '''Module with proper import ordering'''
-        
-        # Standard library imports
-        import os
-        import sys
-        from pathlib import Path
-        
-        # Third-party imports
-        import requests
-        import click
-        
-        # Configuration
-        CONFIG_DIR = Path.home() / '.myapp'
-        DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
-        """).strip())
-        
-        declare(str(test_file), "initialize_config", textwrap.dedent("""
-        def initialize_config():
-            '''Initialize application configuration'''
-            CONFIG_DIR.mkdir(exist_ok=True)
-            return CONFIG_DIR / 'config.json'
-        """).strip())
-        
-        content = test_file.read_text()
-        lines = content.split('\n')
-        
-        # Find critical positions
-        shebang_pos = next((i for i, line in enumerate(lines) if line.startswith('#!/usr/bin/env python3')), -1)
-        import_os_pos = next((i for i, line in enumerate(lines) if line.strip() == 'import os'), -1)
-        import_requests_pos = next((i for i, line in enumerate(lines) if line.strip() == 'import requests'), -1)
-        config_dir_pos = next((i for i, line in enumerate(lines) if 'CONFIG_DIR = ' in line), -1)
-        init_func_pos = next((i for i, line in enumerate(lines) if 'def initialize_config(' in line), -1)
-        existing_func_pos = next((i for i, line in enumerate(lines) if 'def existing():' in line), -1)
-        
-        # Verify strict ordering
-        assert shebang_pos < import_os_pos, "Shebang before imports"
-        assert import_os_pos < import_requests_pos, "Standard imports before third-party"
-        assert import_requests_pos < config_dir_pos, "Imports before configuration"
-        assert config_dir_pos < init_func_pos, "Configuration before new functions"
-        assert existing_func_pos < init_func_pos, "Existing functions before new functions"
-        
+
+    @pytest.mark.parametrize("initial, ops, landmarks, chains", ORDERING_CASES)
+    def test_header_and_declare_ordering(self, py_file, initial, ops, landmarks, chains):
+        """Apply the ops to a file on disk, then check the landmarks appear in order"""
+        py_file.write_text(initial)
+        apply_ops(str(py_file), ops)
+        content = py_file.read_text()
+        pos, last_import, first_function = scan_source(content, landmarks)
+        # Presence and absence both come out of the one scan
+        missing = [key for key, line in pos.items() if line < 0 and not key.startswith('absent_')]
+        assert not missing, f"landmarks not found: {missing}"
+        unexpected = [line for key, line in pos.items() if line >= 0 and key.startswith('absent_')]
+        assert not unexpected, f"removed text still present on lines: {unexpected}"
+        for chain in chains:
+            order = [pos[key] for key in chain]
+            assert all(a < b for a, b in zip(order, order[1:])), \
+                f"bad order: {dict(zip(chain, order))}"
+
         # Verify no function appears before any import
-        all_import_lines = [i for i, line in enumerate(lines) if line.strip().startswith('import ') or line.strip().startswith('from ')]
-        all_function_lines = [i for i, line in enumerate(lines) if 'def ' in line]
-        
-        if all_import_lines and all_function_lines:
-            last_import = max(all_import_lines)
-            first_function = min(all_function_lines)
+        if last_import >= 0 and first_function >= 0:
             assert last_import < first_function, "All imports must come before any function definitions"
 
-
-    def test_complex_interleaved_operations(self, tmp_path):
-        """Test complex sequence of update_header and declare operations"""
-        test_file = tmp_path / "complex.py"
-        test_file.write_text(textwrap.dedent("""
-        import old_module
-        OLD_SETTING = "deprecated"
-        
-        def legacy_function():
-            return "legacy"
-        """).strip())
-        
-        # Sequence: header -> declare -> declare -> header (should replace) -> declare
-        update_header(str(test_file), "import new_module\nNEW_SETTING = 'v1'")
-        
-        declare(str(test_file), "function_a", "def function_a():\n    return 'a'")
-        
-        declare(str(test_file), "function_b", "def function_b():\n    return 'b'")
-        
-        # Replace header again
-        update_header(str(test_file), textwrap.dedent("""
-        import newest_module
-        import another_module
-        NEWEST_SETTING = 'v2'
-        FINAL_CONFIG = True
-        """).strip())
-        
-        declare(str(test_file), "function_c", "def function_c():\n    return 'c'")
-        
-        content = test_file.read_text()
-
-        print("=== DEBUG: Final file content ===")
-        for i, line in enumerate(content.split('\n')):
-            print(f"{i:2}: {line}")
-        print("=== END DEBUG ===")
-
-        lines = content.split('\n')
-        
-        # Find positions
-        newest_import_pos = next((i for i, line in enumerate(lines) if 'import newest_module' in line), -1)
-        final_config_pos = next((i for i, line in enumerate(lines) if 'FINAL_CONFIG = True' in line), -1)
-        func_a_pos = next((i for i, line in enumerate(lines) if 'def function_a():' in line), -1)
-        func_b_pos = next((i for i, line in enumerate(lines) if 'def function_b():' in line), -1)
-        func_c_pos = next((i for i, line in enumerate(lines) if 'def function_c():' in line), -1)
-        legacy_pos = next((i for i, line in enumerate(lines) if 'def legacy_function():' in line), -1)
-        
-        # Verify final header comes first
-        assert newest_import_pos < final_config_pos, "Imports before config in header"
-        assert final_config_pos < func_a_pos, "Header before all functions"
-        assert final_config_pos < func_b_pos, "Header before all functions"
-        assert final_config_pos < func_c_pos, "Header before all functions"
-        assert final_config_pos < legacy_pos, "Header before all functions"
-        
-        # Verify old header elements are gone
-        assert "import old_module" not in content
-        assert "OLD_SETTING" not in content
-        assert "NEW_SETTING" not in content  # From first header replacement
-        
-        # Verify final header elements are present
-        assert "import newest_module" in content
-        assert "FINAL_CONFIG = True" in content
-        
-        # Verify all functions are present and in correct order
-        assert legacy_pos < func_a_pos < func_b_pos < func_c_pos, "Legacy function first, then new functions in declaration order"
+    @pytest.mark.parametrize("initial, ops, landmarks, chains", ORDERING_CASES)
+    def test_batched_ops_match_sequential_calls(self, tmp_path, initial, ops, landmarks, chains):
+        """apply_modification_set folds the ops into one read/write; the result must not differ"""
+        sequential, batched = tmp_path / "sequential.py", tmp_path / "batched.py"
+        sequential.write_text(initial)
+        batched.write_text(initial)
+        apply_ops(str(sequential), ops)
+        apply_modification_set([(update_header, (str(batched), code), {}) if target is HEADER
+                                else (declare, (str(batched), target, code), {})
+                                for target, code in ops], rollback=False)
+        assert batched.read_text() == sequential.read_text()
 
 
 if __name__ == "__main__":